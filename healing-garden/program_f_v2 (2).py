@@ -10,44 +10,173 @@
 - REST API
 - 자동 환경 제어
 - 디버그 메시지 추가 (Firebase 저장 문제 해결용)
+- 헤드리스 벤치마크 모드 (--benchmark)
+- 프레임버퍼 직접 출력 (--framebuffer, X 서버 불필요)
+- 센서 값 오버레이 (--overlay, 데이터가 바뀔 때만 다시 그림)
+- 제어 지연 추적 (X-Trace-Id → API 라우트 → 시리얼 응답, /api/trace/report)
+- 내장 Firestore 제어 리스너 (--control-doc, pi_hardware_control/HTTP 없이 바로 제어)
 """
 
-import cv2
+import time
+PROCESS_START = time.perf_counter()  # --startup-profile 기준 시각
+
 import sys
 import os
 import argparse
-import time
+import glob
+import random
 import json
+import uuid
 from datetime import datetime
-from threading import Thread, Lock
+from collections import deque
+from threading import Thread, Lock, Condition, Event, local
 
 try:
     import serial
+    from serial.tools import list_ports
     SERIAL_AVAILABLE = True
 except ImportError:
     SERIAL_AVAILABLE = False
     print("⚠️  pyserial이 설치되지 않았습니다")
 
-try:
-    from flask import Flask, jsonify, request
-    from flask_cors import CORS
-    FLASK_AVAILABLE = True
-except ImportError:
-    FLASK_AVAILABLE = False
-    print("⚠️  flask가 설치되지 않았습니다")
+# ============================================================================
+# 지연 로딩 (실행 모드에 필요한 무거운 모듈만 import)
+# ============================================================================
+# cv2/numpy는 영상 재생·벤치마크, flask는 --api, firebase_admin은 --firebase일 때만 로드.
+# None = 아직 로드 시도 전
+cv2 = np = None
+Flask = jsonify = request = CORS = None
+firebase_admin = credentials = firestore = None
+CV2_AVAILABLE = None
+FLASK_AVAILABLE = None
+FIREBASE_AVAILABLE = None
 
-try:
-    import firebase_admin
-    from firebase_admin import credentials, firestore
-    FIREBASE_AVAILABLE = True
-except ImportError:
-    FIREBASE_AVAILABLE = False
-    print("⚠️  firebase-admin이 설치되지 않았습니다")
+startup_timings = []  # (단계, 초) - --startup-profile 출력용
+
+class timed:
+    """with 블록 실행 시간을 startup_timings에 기록"""
+    def __init__(self, stage):
+        self.stage = stage
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        startup_timings.append((self.stage, time.perf_counter() - self.started))
+        return False
+
+def load_cv2():
+    """cv2, numpy 로드 (영상 경로에서 호출). 설치되어 있지 않으면 False"""
+    global cv2, np, CV2_AVAILABLE
+    if CV2_AVAILABLE is None:
+        try:
+            with timed('import cv2/numpy'):
+                import cv2 as _cv2
+                import numpy as _np
+            cv2, np = _cv2, _np
+            CV2_AVAILABLE = True
+        except ImportError:
+            CV2_AVAILABLE = False
+            print("⚠️  opencv-python이 설치되지 않았습니다")
+    return CV2_AVAILABLE
+
+def load_flask():
+    """flask, flask_cors 로드. 설치되어 있지 않으면 False"""
+    global Flask, jsonify, request, CORS, FLASK_AVAILABLE
+    if FLASK_AVAILABLE is None:
+        try:
+            with timed('import flask'):
+                from flask import Flask, jsonify, request
+                from flask_cors import CORS
+            FLASK_AVAILABLE = True
+        except ImportError:
+            FLASK_AVAILABLE = False
+            print("⚠️  flask가 설치되지 않았습니다")
+    return FLASK_AVAILABLE
+
+def load_firebase():
+    """firebase_admin 로드. 설치되어 있지 않으면 False"""
+    global firebase_admin, credentials, firestore, FIREBASE_AVAILABLE
+    if FIREBASE_AVAILABLE is None:
+        try:
+            with timed('import firebase_admin'):
+                import firebase_admin
+                from firebase_admin import credentials, firestore
+            FIREBASE_AVAILABLE = True
+        except ImportError:
+            FIREBASE_AVAILABLE = False
+            print("⚠️  firebase-admin이 설치되지 않았습니다")
+    return FIREBASE_AVAILABLE
+
+def print_startup_profile():
+    """import/초기화 단계별 소요 시간 출력"""
+    print("\n⏱️  시작 프로파일")
+    for stage, seconds in startup_timings:
+        print(f"   {stage:<28} {seconds * 1000:8.1f} ms")
+    print(f"   {'합계 (프로세스 시작부터)':<28} {(time.perf_counter() - PROCESS_START) * 1000:8.1f} ms")
+    for name, info in readiness.snapshot().items():
+        at = f"{info['seconds'] * 1000:8.1f} ms" if info['seconds'] is not None else '        -'
+        print(f"   [{name}] {info['state']:<10} {at}")
+    print()
+
+# ============================================================================
+# 서브시스템 준비 상태 (Firebase/시리얼/API 병렬 시작)
+# ============================================================================
+class Readiness:
+    """서브시스템별 준비 상태: starting → ready | failed (등록 안 된 것은 disabled)"""
+    
+    def __init__(self):
+        self.lock = Lock()
+        self.states = {}  # name -> {'state', 'seconds', 'error'}
+        self.changed = Condition(self.lock)
+    
+    def _set(self, name, state, error=None):
+        with self.changed:
+            seconds = None if state == 'starting' else time.perf_counter() - PROCESS_START
+            self.states[name] = {'state': state, 'seconds': seconds, 'error': error}
+            self.changed.notify_all()
+    
+    def begin(self, name):
+        self._set(name, 'starting')
+    
+    def ready(self, name):
+        self._set(name, 'ready')
+    
+    def failed(self, name, error):
+        self._set(name, 'failed', str(error))
+    
+    def state(self, name):
+        with self.lock:
+            return self.states.get(name, {}).get('state', 'disabled')
+    
+    def wait(self, name, timeout=None):
+        """name이 시작 중이 아니게 될 때까지 대기. ready이면 True"""
+        with self.changed:
+            self.changed.wait_for(
+                lambda: self.states.get(name, {}).get('state') != 'starting', timeout)
+            return self.states.get(name, {}).get('state') == 'ready'
+    
+    def snapshot(self):
+        """{name: {'state', 'seconds'(프로세스 시작부터 준비/실패까지), 'error'}}"""
+        with self.lock:
+            return {name: dict(info) for name, info in self.states.items()}
+
+readiness = Readiness()
+STATE_LABELS = {'starting': '시작 중', 'failed': '실패'}
 
 # 설정
 DATA_FILE = "sensor_data.json"
+CONTROL_COLLECTION = "device_control"
 ARDUINO_PORT = "/dev/ttyACM0"
 BAUD_RATE = 9600
+# 케이블이 빠졌다 다시 꽂히면 ttyACM1 등으로 바뀔 수 있으므로 이 패턴들을 검색
+# (설정된 포트가 사라졌을 때만, 그리고 Arduino USB VID인 장치만 - GPS 등 다른 장치는 건드리지 않음)
+SERIAL_PORT_PATTERNS = ["/dev/ttyACM*", "/dev/ttyUSB*"]
+ARDUINO_USB_VIDS = {0x2341, 0x2A03, 0x1A86}  # Arduino, Arduino.org, CH340 (호환 보드)
+SERIAL_SCAN_INTERVAL = 1.0  # 장치 노드 확인 주기 (초)
+SERIAL_RETRY_BASE_DELAY = 1.0  # 재연결 백오프 시작값 (초)
+SERIAL_RETRY_MAX_DELAY = 30.0  # 재연결 백오프 최대값 (초)
 SENSOR_INTERVAL = 180
 API_PORT = 5000
 
@@ -96,6 +225,7 @@ def init_firebase(cred_path):
     
     print(f"[DEBUG] init_firebase 호출됨")
     print(f"[DEBUG] cred_path = {cred_path}")
+    load_firebase()
     print(f"[DEBUG] FIREBASE_AVAILABLE = {FIREBASE_AVAILABLE}")
     
     if not FIREBASE_AVAILABLE:
@@ -147,6 +277,141 @@ def save_to_firebase(data, collection_name='sensor_data'):
         return False
         return False
 
+# Firebase 초기화가 끝나기 전에 읽은 센서 데이터 (준비되면 순서대로 업로드)
+FIREBASE_BACKLOG_MAX = 100
+firebase_backlog = deque(maxlen=FIREBASE_BACKLOG_MAX)
+firebase_backlog_lock = Lock()
+
+def queue_for_firebase(document):
+    """Firebase가 아직 시작 중이면 대기열에 넣고 True, 아니면 False"""
+    with firebase_backlog_lock:
+        if readiness.state('firebase') != 'starting':
+            return False
+        firebase_backlog.append(document)
+        return True
+
+def start_firebase(cred_path):
+    """Firebase 초기화 (백그라운드 스레드) 후 대기열 업로드"""
+    with timed('Firebase 초기화'):
+        ok = init_firebase(cred_path)
+    with firebase_backlog_lock:
+        if ok:
+            readiness.ready('firebase')
+        else:
+            readiness.failed('firebase', '초기화 실패')
+        pending = list(firebase_backlog)
+        firebase_backlog.clear()
+    if not pending:
+        return
+    if not ok:
+        print(f"   ⚠️ Firebase 초기화 실패 - 대기 중이던 {len(pending)}개 데이터를 업로드하지 못했습니다")
+        return
+    print(f"   📤 대기 중이던 {len(pending)}개 데이터 업로드")
+    for document in pending:
+        save_to_firebase(dict(document, timestamp_firebase=firestore.SERVER_TIMESTAMP))
+
+# ============================================================================
+# 제어 지연 추적 (Firestore 쓰기 → 리스너 → HTTP → API 라우트 → 시리얼 응답)
+# ============================================================================
+# 히스토그램 구간 (ms)
+TRACE_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+class LatencyTracer:
+    """
+    trace id별로 단계(stage) 도착 시각을 기록하고 구간별 지연 통계를 집계
+    
+    앞 단계(Firestore/리스너/HTTP 전송)의 시각은 X-Trace-Stages 헤더로 함께 전달되고,
+    이 프로세스에서는 api_route, serial_write, serial_ack, api_done 단계를 기록합니다.
+    """
+    
+    def __init__(self, max_traces=1000, max_active=200):
+        self.active = {}
+        self.completed = deque(maxlen=max_traces)
+        self.max_active = max_active
+        self.lock = Lock()
+    
+    def begin(self, trace_id, stages=()):
+        with self.lock:
+            if len(self.active) >= self.max_active:
+                # 끝나지 않은 오래된 trace 정리
+                self.active.pop(next(iter(self.active)))
+            self.active[trace_id] = [(str(name), float(t)) for name, t in stages]
+    
+    def mark(self, trace_id, stage, t=None):
+        with self.lock:
+            if trace_id in self.active:
+                self.active[trace_id].append((stage, time.time() if t is None else t))
+    
+    def discard(self, trace_id):
+        """적용되지 않고 버려진(합쳐진) trace 제거"""
+        with self.lock:
+            self.active.pop(trace_id, None)
+    
+    def finish(self, trace_id):
+        with self.lock:
+            stages = self.active.pop(trace_id, None)
+            if stages:
+                self.completed.append((trace_id, sorted(stages, key=lambda s: s[1])))
+    
+    @staticmethod
+    def _summary(values):
+        values = sorted(values)
+        pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+        histogram = {}
+        for bound in TRACE_BUCKETS_MS + [None]:
+            label = f"<={bound}ms" if bound is not None else f">{TRACE_BUCKETS_MS[-1]}ms"
+            histogram[label] = 0
+        for v in values:
+            for bound in TRACE_BUCKETS_MS:
+                if v <= bound:
+                    histogram[f"<={bound}ms"] += 1
+                    break
+            else:
+                histogram[f">{TRACE_BUCKETS_MS[-1]}ms"] += 1
+        return {
+            'count': len(values),
+            'p50_ms': round(pick(0.5), 2),
+            'p90_ms': round(pick(0.9), 2),
+            'p99_ms': round(pick(0.99), 2),
+            'max_ms': round(values[-1], 2),
+            'histogram': histogram,
+        }
+    
+    def report(self, slowest=10):
+        """구간별(앞 단계 → 다음 단계) 지연 히스토그램과 가장 느린 trace 목록"""
+        with self.lock:
+            traces = list(self.completed)
+        
+        hops = {}
+        totals = []
+        for trace_id, stages in traces:
+            for (prev, t0), (stage, t1) in zip(stages, stages[1:]):
+                hops.setdefault(f"{prev} → {stage}", []).append((t1 - t0) * 1000)
+            totals.append(((stages[-1][1] - stages[0][1]) * 1000, trace_id, stages))
+        
+        totals.sort(key=lambda x: x[0], reverse=True)
+        return {
+            'traces': len(traces),
+            'total': self._summary([t[0] for t in totals]) if totals else None,
+            'hops': {hop: self._summary(values) for hop, values in hops.items()},
+            'slowest': [
+                {
+                    'trace_id': trace_id,
+                    'total_ms': round(total, 2),
+                    'stages': [{'stage': name, 'offset_ms': round((t - stages[0][1]) * 1000, 2)}
+                               for name, t in stages],
+                }
+                for total, trace_id, stages in totals[:slowest]
+            ],
+        }
+
+tracer = LatencyTracer()
+# 현재 스레드(API 요청)가 처리 중인 trace id - send_command에서 사용
+trace_context = local()
+
+def current_trace_id():
+    return getattr(trace_context, 'trace_id', None)
+
 # ============================================================================
 # 센서 모니터링 클래스 (Matrix + Firebase + 팬 + 펌프)
 # ============================================================================
@@ -158,6 +423,12 @@ class SensorMonitor:
         self.data_file = data_file
         self.use_firebase = use_firebase
         self.serial_conn = None
+        self.connected_port = None
+        self.connection_lost = Event()  # I/O 오류 시 설정 → 감시 스레드가 재연결
+        self.ever_connected = False
+        self.desired = {}  # 마지막으로 요청된 장치 상태 (재연결 후 다시 적용)
+        self.desired_lock = Lock()
+        self.serial_lock = Lock()  # 시리얼 I/O와 연결 교체는 이 락 안에서만
         self.running = False
         self.last_sensor_data = None
         self.latest_data = None  # API용 최신 데이터
@@ -167,55 +438,178 @@ class SensorMonitor:
             with open(self.data_file, 'w', encoding='utf-8') as f:
                 json.dump([], f, ensure_ascii=False, indent=2)
     
-    def connect_arduino(self):
+    def connect_arduino(self, port=None):
         if not SERIAL_AVAILABLE:
             return False
+        port = port or self.arduino_port
         try:
-            self.serial_conn = serial.Serial(self.arduino_port, self.baud_rate, timeout=1)
-            time.sleep(2)
-            print(f"✅ Arduino 연결 성공: {self.arduino_port}")
+            conn = serial.Serial(port, self.baud_rate, timeout=1)
+            time.sleep(2)  # 포트를 열면 보드가 리셋됨
+            with self.serial_lock:
+                self.connection_lost.clear()
+                self.serial_conn = conn
+                self.connected_port = port
+            print(f"✅ Arduino 연결 성공: {port}")
             return True
         except Exception as e:
             print(f"❌ Arduino 연결 실패: {e}")
             return False
     
+    # ===== 연결 감시 (자동 재연결) =====
+    def scan_ports(self):
+        """
+        연결할 장치 노드 목록
+        
+        설정된 포트가 있으면 그 포트만 사용합니다. 없을 때만 패턴에 맞는 노드 중
+        Arduino USB VID를 가진 장치로 대체합니다 (포트를 열면 장치가 리셋되므로
+        다른 USB 시리얼 장치는 열지 않음).
+        """
+        if os.path.exists(self.arduino_port):
+            return [self.arduino_port]
+        nodes = {p for pattern in SERIAL_PORT_PATTERNS for p in glob.glob(pattern)}
+        if not SERIAL_AVAILABLE:
+            return []
+        return sorted(info.device for info in list_ports.comports()
+                      if info.device in nodes and info.vid in ARDUINO_USB_VIDS)
+    
+    def mark_connection_lost(self, error):
+        """시리얼 I/O 오류 발생 - 감시 스레드에 재연결 요청"""
+        if not self.connection_lost.is_set():
+            print(f"⚠️  Arduino 통신 오류: {error}")
+            self.connection_lost.set()
+    
+    def _drop_connection(self, reason):
+        with self.serial_lock:
+            conn, self.serial_conn = self.serial_conn, None
+            if conn:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        print(f"🔌 Arduino 연결 끊김 ({reason}) - 재연결을 시도합니다")
+        readiness.failed('serial', reason)
+    
+    def _wait_for_new_port(self, delay):
+        """delay초 동안 대기하되, 새 장치 노드가 나타나면 바로 반환"""
+        before = set(self.scan_ports())
+        deadline = time.monotonic() + delay
+        while self.running and time.monotonic() < deadline:
+            time.sleep(min(SERIAL_SCAN_INTERVAL, max(0.0, deadline - time.monotonic())))
+            if set(self.scan_ports()) - before:
+                return True
+        return False
+    
+    def supervise_connection(self):
+        """연결 감시 루프: 끊기면 지수 백오프로 재연결, 장치 노드 추가/제거 감지"""
+        delay = SERIAL_RETRY_BASE_DELAY
+        waiting_printed = False
+        while self.running:
+            if self.serial_conn is None:
+                ports = self.scan_ports()
+                if not ports:
+                    if not waiting_printed:
+                        print(f"⏳ Arduino 장치를 기다리는 중... ({', '.join(SERIAL_PORT_PATTERNS)})")
+                        waiting_printed = True
+                    readiness.failed('serial', '장치 없음')
+                    self._wait_for_new_port(SERIAL_RETRY_MAX_DELAY)
+                    continue
+                waiting_printed = False
+                with timed('Arduino 연결'):
+                    connected = any(self.connect_arduino(port) for port in ports)
+                if connected:
+                    delay = SERIAL_RETRY_BASE_DELAY
+                    readiness.ready('serial')
+                    if self.ever_connected:
+                        print("🔁 Arduino 재연결 - 마지막 장치 상태를 다시 적용합니다")
+                        self.reapply_desired_state()
+                    self.ever_connected = True
+                    continue
+                readiness.failed('serial', f'{", ".join(ports)} 연결 실패')
+                # 백오프 (지터 포함) 중에도 새 장치가 꽂히면 바로 재시도
+                self._wait_for_new_port(random.uniform(delay / 2, delay))
+                delay = min(SERIAL_RETRY_MAX_DELAY, delay * 2)
+            else:
+                # 연결 중: I/O 오류 또는 장치 노드 제거 감지
+                if self.connection_lost.wait(SERIAL_SCAN_INTERVAL):
+                    if not self.running:
+                        break
+                    self._drop_connection('통신 오류')
+                elif not os.path.exists(self.connected_port):
+                    self._drop_connection(f'{self.connected_port} 제거됨')
+    
+    def _want(self, key, value):
+        with self.desired_lock:
+            self.desired[key] = value
+    
+    def reapply_desired_state(self):
+        """재연결 후 (보드 리셋으로 초기화된) 팬/LED 상태 복원.
+        펌프는 시간 제한 동작이라 다시 켜지 않음"""
+        with self.desired_lock:
+            desired = dict(self.desired)
+        if 'brightness' in desired:
+            self.matrix_brightness(desired['brightness'])
+        matrix = desired.get('matrix')
+        if matrix and matrix[0] == 'rgb':
+            self.matrix_on(*matrix[1:])
+        elif matrix and matrix[0] == 'name':
+            self.matrix_color(matrix[1])
+        elif matrix and matrix[0] == 'off':
+            self.matrix_off()
+        if 'fan' in desired:
+            if desired['fan']:
+                self.fan_on()
+            else:
+                self.fan_off()
+    
     def send_command(self, command):
         """명령 전송"""
-        if not self.serial_conn or not self.serial_conn.is_open:
-            return None
-        try:
-            self.serial_conn.write(f"{command}\n".encode())
-            time.sleep(0.1)
-            if self.serial_conn.in_waiting > 0:
-                response = self.serial_conn.readline().decode('utf-8').strip()
-                return response
-            return None
-        except Exception as e:
-            print(f"❌ 명령 전송 실패: {e}")
-            return None
+        trace_id = current_trace_id()
+        with self.serial_lock:
+            if not self.serial_conn or not self.serial_conn.is_open:
+                return None
+            try:
+                if trace_id:
+                    tracer.mark(trace_id, 'serial_write')
+                self.serial_conn.write(f"{command}\n".encode())
+                time.sleep(0.1)
+                if self.serial_conn.in_waiting > 0:
+                    response = self.serial_conn.readline().decode('utf-8').strip()
+                    if trace_id:
+                        tracer.mark(trace_id, 'serial_ack')
+                    return response
+                return None
+            except Exception as e:
+                print(f"❌ 명령 전송 실패: {e}")
+                if isinstance(e, (OSError, serial.SerialException)):
+                    self.mark_connection_lost(e)
+                return None
     
     def read_sensor_data(self):
         """센서 데이터 읽기"""
-        if not self.serial_conn or not self.serial_conn.is_open:
-            return None
-        try:
-            self.serial_conn.write(b'READ\n')
-            time.sleep(0.5)
-            
-            if self.serial_conn.in_waiting > 0:
-                line = self.serial_conn.readline().decode('utf-8').strip()
-                try:
-                    data = json.loads(line)
-                    self.last_sensor_data = data
-                    return data
-                except json.JSONDecodeError:
-                    return None
-        except Exception as e:
-            return None
+        with self.serial_lock:
+            if not self.serial_conn or not self.serial_conn.is_open:
+                return None
+            try:
+                self.serial_conn.write(b'READ\n')
+                time.sleep(0.5)
+                
+                if self.serial_conn.in_waiting > 0:
+                    line = self.serial_conn.readline().decode('utf-8').strip()
+                    try:
+                        data = json.loads(line)
+                        self.last_sensor_data = data
+                        return data
+                    except json.JSONDecodeError:
+                        return None
+            except Exception as e:
+                if isinstance(e, (OSError, serial.SerialException)):
+                    self.mark_connection_lost(e)
+                return None
     
     # ===== LED Matrix 제어 =====
     def matrix_on(self, r=255, g=255, b=255):
         """Matrix 켜기 (페이드 효과 자동)"""
+        self._want('matrix', ('rgb', r, g, b))
         response = self.send_command(f"MATRIX:COLOR:{r},{g},{b}")
         if response and response.startswith("OK:MATRIX_ON"):
             with matrix_lock:
@@ -227,6 +621,7 @@ class SensorMonitor:
     
     def matrix_off(self):
         """Matrix 끄기 (페이드 효과 자동)"""
+        self._want('matrix', ('off',))
         response = self.send_command("MATRIX:OFF")
         if response == "OK:MATRIX_OFF":
             with matrix_lock:
@@ -237,6 +632,7 @@ class SensorMonitor:
     
     def matrix_color(self, color_name):
         """Matrix 색상 변경"""
+        self._want('matrix', ('name', color_name))
         response = self.send_command(f"MATRIX:{color_name.upper()}")
         if response and response.startswith("OK:MATRIX_ON"):
             with matrix_lock:
@@ -248,6 +644,7 @@ class SensorMonitor:
     def matrix_brightness(self, level):
         """Matrix 밝기 조절"""
         level = max(0, min(255, level))
+        self._want('brightness', level)
         response = self.send_command(f"MATRIX:BRIGHT:{level}")
         if response and response.startswith("OK:MATRIX_BRIGHTNESS"):
             with matrix_lock:
@@ -258,6 +655,7 @@ class SensorMonitor:
     # 🆕 팬 제어
     def fan_on(self):
         """팬 켜기"""
+        self._want('fan', True)
         response = self.send_command("FAN:ON")
         if response == "OK:FAN_ON":
             with device_lock:
@@ -268,6 +666,7 @@ class SensorMonitor:
     
     def fan_off(self):
         """팬 끄기"""
+        self._want('fan', False)
         response = self.send_command("FAN:OFF")
         if response == "OK:FAN_OFF":
             with device_lock:
@@ -385,7 +784,9 @@ class SensorMonitor:
             print(f"   [DEBUG] firebase_db is None = {firebase_db is None}")
             print(f"   [DEBUG] FIREBASE_AVAILABLE = {FIREBASE_AVAILABLE}")
             
-            if firebase_db is not None:
+            if queue_for_firebase(document):
+                print(f"   ⏳ Firebase 준비 중 - 업로드 대기열에 추가 ({len(firebase_backlog)}개)")
+            elif firebase_db is not None:
                 try:
                     document['timestamp_firebase'] = firestore.SERVER_TIMESTAMP
                     print(f"   [DEBUG] save_to_firebase 호출 중...")
@@ -432,6 +833,10 @@ class SensorMonitor:
         print("="*60)
         
         while self.running:
+            if not self.serial_conn:
+                # 연결(재연결) 대기 - 연결되는 즉시 첫 데이터를 읽음
+                time.sleep(SERIAL_SCAN_INTERVAL)
+                continue
             sensor_data = self.read_sensor_data()
             
             if sensor_data:
@@ -450,12 +855,13 @@ class SensorMonitor:
             time.sleep(interval)
     
     def start(self, interval=SENSOR_INTERVAL):
-        """모니터링 시작"""
-        arduino_ok = self.connect_arduino()
-        if not arduino_ok:
+        """모니터링 시작 (Arduino 연결/재연결은 감시 스레드가 백그라운드에서)"""
+        if not SERIAL_AVAILABLE:
+            readiness.failed('serial', 'pyserial 없음')
             return None
-        
+        readiness.begin('serial')
         self.running = True
+        Thread(target=self.supervise_connection, daemon=True).start()
         monitor_thread = Thread(target=self.monitor_loop, args=(interval,), daemon=True)
         monitor_thread.start()
         return monitor_thread
@@ -463,8 +869,143 @@ class SensorMonitor:
     def stop(self):
         """모니터링 중지"""
         self.running = False
-        if self.serial_conn and self.serial_conn.is_open:
-            self.serial_conn.close()
+        self.connection_lost.set()  # 감시 스레드 깨우기
+        with self.serial_lock:
+            if self.serial_conn and self.serial_conn.is_open:
+                self.serial_conn.close()
+
+# ============================================================================
+# 내장 Firestore 제어 리스너 (device_control 문서 → SensorMonitor 직접 제어)
+# ============================================================================
+class ControlListener:
+    """
+    제어 문서를 직접 구독해서 SensorMonitor 액추에이터 메서드로 적용
+    
+    pi_hardware_control의 DeviceDispatcher와 같은 방식입니다. 리스너 스레드는
+    필드별 슬롯에 최신 값만 덮어쓰고 바로 반환하고 (latest-wins), 워커가 마지막으로
+    적용된 값과 다른 필드만 적용합니다. 시리얼 포트가 하나뿐이므로 워커도 하나입니다.
+    """
+    
+    def __init__(self, sensor_monitor, doc_id, collection=CONTROL_COLLECTION):
+        self.sensor_monitor = sensor_monitor
+        self.doc_id = doc_id
+        self.collection = collection
+        self.handlers = {
+            'fan': self._apply_fan,
+            'water_pump': self._apply_pump,
+            'led_brightness': self._apply_brightness,
+        }
+        self.applied = {}
+        self.in_flight = set()  # 워커가 지금 적용 중인 필드
+        self.slots = {}      # 필드 → (원하는 값, trace id)
+        self.coalesced = 0
+        self.running = False
+        self.stopped = False
+        self.watch = None
+        self.cond = Condition()
+        self.lifecycle = Lock()  # start()/stop() 순서 보장 (start가 늦게 실행되어도 구독이 남지 않게)
+    
+    def _apply_fan(self, value):
+        return self.sensor_monitor.fan_on() if value else self.sensor_monitor.fan_off()
+    
+    def _apply_pump(self, value):
+        return self.sensor_monitor.pump_on() if value else self.sensor_monitor.pump_off()
+    
+    def _apply_brightness(self, value):
+        level = int(value or 0)
+        if level <= 0:
+            return self.sensor_monitor.matrix_off()
+        ok = self.sensor_monitor.matrix_brightness(level)
+        if ok and not matrix_state['on']:
+            ok = self.sensor_monitor.matrix_on()
+        return ok
+    
+    def on_snapshot(self, doc_snapshot, changes, read_time):
+        """Firestore 리스너 스레드 - 슬롯만 갱신하고 바로 반환"""
+        for doc in doc_snapshot:
+            if not doc.exists:
+                continue
+            trace_id = uuid.uuid4().hex[:12]
+            stages = [('listener', time.time())]
+            update_time = getattr(doc, 'update_time', None)
+            if update_time is not None:
+                stages.insert(0, ('firestore_write', update_time.timestamp()))
+            
+            data = doc.to_dict() or {}
+            with self.cond:
+                for field in self.handlers:
+                    if field not in data:
+                        continue
+                    if field in self.slots:
+                        self.coalesced += 1
+                        tracer.discard(self.slots.pop(field)[1])
+                    # 적용 중인 필드는 applied가 아직 이전 값이므로 건너뛰지 않음 (워커가 꺼낼 때 다시 비교)
+                    if (field not in self.in_flight and field in self.applied
+                            and self.applied[field] == data[field]):
+                        continue  # 이미 적용된 값 - trace를 만들지 않음
+                    field_trace = f"{trace_id}-{field}"
+                    tracer.begin(field_trace, stages)
+                    self.slots[field] = (data[field], field_trace)
+                self.cond.notify_all()
+    
+    def _worker(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.slots or not self.running)
+                if not self.slots:
+                    return
+                field = next(iter(self.slots))
+                value, trace_id = self.slots.pop(field)
+                if field in self.applied and self.applied[field] == value:
+                    tracer.finish(trace_id)
+                    continue
+                self.in_flight.add(field)
+            
+            tracer.mark(trace_id, 'apply')
+            trace_context.trace_id = trace_id
+            try:
+                ok = bool(self.handlers[field](value))
+            except Exception as e:
+                print(f"❌ 제어 적용 오류 ({field}): {e}")
+                ok = False
+            finally:
+                trace_context.trace_id = None
+            tracer.mark(trace_id, 'applied')
+            tracer.finish(trace_id)
+            
+            with self.cond:
+                self.in_flight.discard(field)
+                if ok:
+                    self.applied[field] = value
+            if not ok:
+                print(f"   ⚠️ {field} = {value} 적용 실패 (다음 변경 때 다시 시도)")
+    
+    def start(self):
+        with self.lifecycle:
+            if self.stopped:
+                return False  # 이미 종료 중
+            if not firebase_db:
+                print("❌ 제어 리스너: Firebase가 초기화되지 않았습니다 (--firebase 필요)")
+                return False
+            self.running = True
+            Thread(target=self._worker, daemon=True).start()
+            doc_ref = firebase_db.collection(self.collection).document(self.doc_id)
+            # 첫 스냅샷에서 현재 문서 상태가 적용됨
+            self.watch = doc_ref.on_snapshot(self.on_snapshot)
+            print(f"📡 Firestore 제어 리스너 시작: {self.collection}/{self.doc_id}")
+            return True
+    
+    def stop(self):
+        with self.lifecycle:
+            self.stopped = True
+            if self.watch:
+                self.watch.unsubscribe()
+                self.watch = None
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.coalesced:
+            print(f"   합쳐진(건너뛴) 중간 제어 값: {self.coalesced}개")
 
 # ============================================================================
 # API 서버
@@ -476,12 +1017,38 @@ class APIServer:
         self.port = port
         self.app = None
         
-        if FLASK_AVAILABLE:
+        if load_flask():
             self.app = Flask(__name__)
             CORS(self.app)
             self.setup_routes()
     
     def setup_routes(self):
+        @self.app.before_request
+        def trace_begin():
+            trace_id = request.headers.get('X-Trace-Id')
+            trace_context.trace_id = trace_id
+            if not trace_id:
+                return
+            try:
+                tracer.begin(trace_id, json.loads(request.headers.get('X-Trace-Stages', '[]')))
+            except (TypeError, ValueError):
+                # 형식이 잘못된 단계 정보는 버리고 요청은 그대로 처리
+                tracer.begin(trace_id)
+            tracer.mark(trace_id, 'api_route')
+        
+        @self.app.teardown_request
+        def trace_end(exc):
+            trace_id = current_trace_id()
+            if trace_id:
+                tracer.mark(trace_id, 'api_done')
+                tracer.finish(trace_id)
+            trace_context.trace_id = None
+        
+        @self.app.route('/api/trace/report')
+        def trace_report():
+            slowest = request.args.get('slowest', 10, type=int)
+            return jsonify({'success': True, 'report': tracer.report(slowest)})
+        
         @self.app.route('/')
         def index():
             firebase_status = "📤 활성화" if firebase_db else "❌ 비활성화"
@@ -670,6 +1237,49 @@ class APIServer:
                 return jsonify({'success': True})
             return jsonify({'success': False})
         
+        # 🆕 pi_hardware_control용 상태 기반 제어 (실패 시 503 → 재시도 대상)
+        def control_result(ok, **extra):
+            if ok:
+                return jsonify({'success': True, **extra})
+            return jsonify({'success': False, **extra}), 503
+        
+        @self.app.route('/api/control/fan', methods=['POST'])
+        def control_fan():
+            state = bool((request.get_json(silent=True) or {}).get('state'))
+            monitor = self.sensor_monitor
+            ok = monitor and (monitor.fan_on() if state else monitor.fan_off())
+            return control_result(ok, state=state)
+        
+        @self.app.route('/api/control/pump', methods=['POST'])
+        def control_pump():
+            state = bool((request.get_json(silent=True) or {}).get('state'))
+            monitor = self.sensor_monitor
+            ok = monitor and (monitor.pump_on() if state else monitor.pump_off())
+            return control_result(ok, state=state)
+        
+        @self.app.route('/api/control/light', methods=['POST'])
+        def control_light():
+            state = bool((request.get_json(silent=True) or {}).get('state'))
+            monitor = self.sensor_monitor
+            ok = monitor and (monitor.matrix_on() if state else monitor.matrix_off())
+            return control_result(ok, state=state)
+        
+        @self.app.route('/api/control/light/brightness', methods=['POST'])
+        def control_light_brightness():
+            try:
+                level = int((request.get_json(silent=True) or {}).get('brightness', 0))
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'error': 'invalid brightness'}), 400
+            monitor = self.sensor_monitor
+            if not monitor:
+                return control_result(False)
+            if level <= 0:
+                return control_result(monitor.matrix_off(), brightness=0)
+            ok = monitor.matrix_brightness(level)
+            if ok and not matrix_state['on']:
+                ok = monitor.matrix_on()
+            return control_result(ok, brightness=level)
+        
         # 🔥 Firebase 업로드
         @self.app.route('/api/firebase/upload', methods=['POST'])
         def firebase_upload():
@@ -749,25 +1359,280 @@ class APIServer:
                     'success': True,
                     'matrix': matrix_state,
                     'devices': device_state,
-                    'auto_control': auto_control
+                    'auto_control': auto_control,
+                    'readiness': readiness.snapshot()
                 })
+        
+        @self.app.route('/api/ready')
+        def get_ready():
+            """서브시스템별 준비 상태 (시작 중이거나 실패한 것이 있으면 ready=false)"""
+            subsystems = readiness.snapshot()
+            all_ready = all(info['state'] == 'ready' for info in subsystems.values())
+            return jsonify({'success': True, 'ready': all_ready, 'subsystems': subsystems})
     
     def start(self):
         if not FLASK_AVAILABLE:
             return None
         
-        def run_server():
-            print(f"\n🌐 API 서버 시작: http://0.0.0.0:{self.port}")
-            self.app.run(host='0.0.0.0', port=self.port, debug=False, use_reloader=False)
+        # 소켓을 여기서 바로 열어서, 반환 시점에 요청을 받을 수 있음 (대기 sleep 불필요)
+        from werkzeug.serving import make_server
+        readiness.begin('api')
+        try:
+            self.server = make_server('0.0.0.0', self.port, self.app, threaded=True)
+        except OSError as e:
+            print(f"❌ API 서버 시작 실패: {e}")
+            readiness.failed('api', e)
+            return None
+        readiness.ready('api')
+        print(f"\n🌐 API 서버 시작: http://0.0.0.0:{self.port}")
         
-        api_thread = Thread(target=run_server, daemon=True)
+        api_thread = Thread(target=self.server.serve_forever, daemon=True)
         api_thread.start()
         return api_thread
 
+# ============================================================================
+# 센서 오버레이 (영상 위에 온도/습도/조도 표시)
+# ============================================================================
+class SensorOverlay:
+    """센서 값 오버레이 레이어
+
+    텍스트는 get_data()가 새 데이터를 돌려줄 때만 다시 그리고, 프레임마다
+    오버레이 영역만 정수 알파 블렌딩합니다 (프레임 전체는 건드리지 않음).
+    """
+    
+    def __init__(self, get_data, position='bottom-left', margin=20, scale=0.8):
+        if not load_cv2():
+            raise RuntimeError("센서 오버레이에는 opencv-python이 필요합니다")
+        self.get_data = get_data
+        self.position = position
+        self.margin = margin
+        self.scale = scale
+        self.cached_data = None
+        self.premultiplied = None  # layer * alpha (uint16)
+        self.inverse_alpha = None  # 256 - alpha (uint16)
+    
+    def _format(self, data):
+        # Hershey 폰트는 한글/° 기호를 지원하지 않으므로 ASCII로 표시
+        def value(key, fmt):
+            v = data.get(key)
+            return fmt.format(v) if isinstance(v, (int, float)) else '-'
+        return (f"T {value('temperature', '{:.1f}')}C  "
+                f"H {value('humidity', '{:.0f}')}%  "
+                f"L {value('light_level', '{:.0f}')}")
+    
+    def _render(self, data):
+        text = self._format(data)
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        thickness = 2
+        (text_w, text_h), baseline = cv2.getTextSize(text, font, self.scale, thickness)
+        pad = 10
+        height, width = text_h + baseline + pad * 2, text_w + pad * 2
+        
+        layer = np.zeros((height, width, 3), dtype=np.uint8)
+        alpha = np.full((height, width), 128, dtype=np.uint8)  # 반투명 배경
+        origin = (pad, pad + text_h)
+        cv2.putText(layer, text, origin, font, self.scale, (255, 255, 255), thickness, cv2.LINE_AA)
+        cv2.putText(alpha, text, origin, font, self.scale, 255, thickness, cv2.LINE_AA)
+        
+        alpha = alpha.astype(np.uint16)[:, :, None]
+        self.premultiplied = layer.astype(np.uint16) * alpha
+        self.inverse_alpha = 256 - alpha
+    
+    def apply(self, frame):
+        """프레임의 오버레이 영역에 레이어를 합성 (제자리 수정)"""
+        data = self.get_data()
+        if not data:
+            return frame
+        if data is not self.cached_data:
+            self._render(data)
+            self.cached_data = data
+        
+        height, width = self.premultiplied.shape[:2]
+        frame_h, frame_w = frame.shape[:2]
+        if height + self.margin > frame_h or width + self.margin > frame_w:
+            return frame
+        
+        x = self.margin
+        y = self.margin if self.position.startswith('top') else frame_h - height - self.margin
+        roi = frame[y:y + height, x:x + width]
+        roi[:] = (roi * self.inverse_alpha + self.premultiplied) >> 8
+        return frame
+
+# ============================================================================
+# 프레임버퍼 출력 (X 서버 없이 /dev/fb0에 직접 쓰기)
+# ============================================================================
+FBIOGET_VSCREENINFO = 0x4600
+
+# bits_per_pixel → (cv2 변환 코드 이름, 채널 수)
+FB_PIXEL_FORMATS = {
+    16: ('COLOR_BGR2BGR565', 2),
+    24: (None, 3),
+    32: ('COLOR_BGR2BGRA', 4),
+}
+
+class FramebufferOutput:
+    """메모리 매핑된 리눅스 프레임버퍼 출력
+
+    장치의 해상도/색 깊이는 ioctl(FBIOGET_VSCREENINFO)과 sysfs에서 읽고,
+    일반 파일(테스트용 대체 장치)이면 fallback_geometry를 사용합니다.
+    """
+    
+    def __init__(self, device='/dev/fb0', fallback_geometry=(1920, 1080, 32)):
+        if not load_cv2():
+            raise RuntimeError("프레임버퍼 출력에는 opencv-python이 필요합니다")
+        self.device = device
+        self.width, self.height, self.bpp, self.stride = self._read_geometry(fallback_geometry)
+        if self.bpp not in FB_PIXEL_FORMATS:
+            raise ValueError(f"지원하지 않는 색 깊이: {self.bpp}bpp")
+        
+        code_name, self.channels = FB_PIXEL_FORMATS[self.bpp]
+        self.convert_code = getattr(cv2, code_name) if code_name else None
+        
+        size = self.stride * self.height
+        is_device = device.startswith('/dev/')
+        self.fd = os.open(device, os.O_RDWR if is_device else os.O_RDWR | os.O_CREAT)
+        if not is_device and os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        
+        import mmap
+        self.mm = mmap.mmap(self.fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        rows = np.ndarray((self.height, self.stride), dtype=np.uint8, buffer=self.mm)
+        row_bytes = self.width * self.channels
+        self.screen = rows[:, :row_bytes].reshape(self.height, self.width, self.channels)
+        self.contiguous = self.stride == row_bytes
+        
+        # 프레임마다 새로 할당하지 않도록 버퍼 재사용
+        self.resized = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self.converted = None if self.contiguous else np.empty_like(self.screen)
+    
+    def _read_geometry(self, fallback_geometry):
+        width, height, bpp = fallback_geometry
+        stride = None
+        try:
+            import fcntl
+            import struct
+            buf = bytearray(160)  # sizeof(struct fb_var_screeninfo)
+            with open(self.device, 'rb') as f:
+                fcntl.ioctl(f.fileno(), FBIOGET_VSCREENINFO, buf)
+            width, height, _, _, _, _, bpp = struct.unpack_from('7I', buf)
+        except (OSError, ImportError):
+            pass  # 일반 파일이면 fallback 사용
+        else:
+            # 실제 framebuffer일 때만 sysfs stride 사용 (테스트용 파일 이름이 fb0이어도 무시)
+            name = os.path.basename(self.device)
+            try:
+                with open(f'/sys/class/graphics/{name}/stride') as f:
+                    stride = int(f.read().strip())
+            except (OSError, ValueError):
+                pass
+        
+        if stride is None:
+            stride = width * bpp // 8
+        return width, height, bpp, stride
+    
+    def fit(self, frame):
+        """BGR 프레임을 화면 크기로 맞춤 (재사용 버퍼에 리사이즈)"""
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height), dst=self.resized,
+                               interpolation=cv2.INTER_LINEAR)
+        return frame
+    
+    def show(self, frame):
+        """BGR 프레임을 화면 크기로 맞춘 뒤 한 번에 변환해서 기록"""
+        frame = self.fit(frame)
+        
+        if self.convert_code is None:
+            self.screen[:] = frame
+        elif self.contiguous:
+            cv2.cvtColor(frame, self.convert_code, dst=self.screen)
+        else:
+            cv2.cvtColor(frame, self.convert_code, dst=self.converted)
+            self.screen[:] = self.converted
+    
+    def close(self):
+        self.screen = None
+        self.mm.close()
+        os.close(self.fd)
+
+def play_video_framebuffer(video_path, fb_device='/dev/fb0', loop=False,
+                           enable_api_control=False, fallback_geometry=(1920, 1080, 32),
+                           overlay=None):
+    """프레임버퍼로 영상 재생 (키보드 대신 API로 제어)"""
+    if not load_cv2():
+        return False
+    if not os.path.exists(video_path):
+        print(f"\n❌ 오류: '{video_path}' 파일을 찾을 수 없습니다.")
+        return False
+    
+    try:
+        output = FramebufferOutput(fb_device, fallback_geometry)
+    except Exception as e:
+        print(f"❌ 프레임버퍼 열기 실패 ({fb_device}): {e}")
+        return False
+    
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        output.close()
+        return False
+    
+    with video_control_lock:
+        video_control['playing'] = True
+        video_control['paused'] = False
+        video_control['stopped'] = False
+        video_control['fullscreen'] = True
+    
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_time = 1.0 / fps if fps > 0 else 1.0 / 30
+    paused = False
+    
+    print(f"\n🎬 프레임버퍼 재생 시작: {fb_device} ({output.width}x{output.height}, {output.bpp}bpp)")
+    
+    try:
+        next_frame = time.perf_counter()
+        while True:
+            if enable_api_control:
+                with video_control_lock:
+                    if video_control['stopped']:
+                        break
+                    paused = video_control['paused']
+            
+            if paused:
+                time.sleep(0.1)
+                next_frame = time.perf_counter()
+                continue
+            
+            ret, frame = cap.read()
+            if not ret:
+                if loop:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+            
+            if overlay:
+                frame = overlay.apply(output.fit(frame))
+            output.show(frame)
+            
+            next_frame += frame_time
+            wait = next_frame - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            else:
+                next_frame = time.perf_counter()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        output.close()
+    
+    return True
+
 # ============================================================================
 # 영상 재생 (전면 가득 채우기)
 # ============================================================================
-def play_video(video_path, fullscreen=False, loop=False, enable_api_control=False):
+def play_video(video_path, fullscreen=False, loop=False, enable_api_control=False, overlay=None):
+    if not load_cv2():
+        return False
+    
     if not os.path.exists(video_path):
         print(f"\n❌ 오류: '{video_path}' 파일을 찾을 수 없습니다.")
         return False
@@ -835,6 +1700,9 @@ def play_video(video_path, fullscreen=False, loop=False, enable_api_control=Fals
                 if fullscreen or cv2.getWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN) == cv2.WINDOW_FULLSCREEN:
                     frame = cv2.resize(frame, (screen_width, screen_height), interpolation=cv2.INTER_LINEAR)
                 
+                if overlay:
+                    frame = overlay.apply(frame)
+                
                 cv2.imshow(window_name, frame)
             
             key = cv2.waitKey(delay if not paused else 100) & 0xFF
@@ -866,10 +1734,114 @@ def play_video(video_path, fullscreen=False, loop=False, enable_api_control=Fals
     
     return True
 
+# ============================================================================
+# 헤드리스 벤치마크 (화면 없이 디코드/리사이즈/변환 성능 측정)
+# ============================================================================
+# 출력 픽셀 포맷 → cv2 변환 코드 이름 (none은 BGR 그대로)
+PIXEL_CONVERSIONS = {
+    'none': None,
+    'rgb': 'COLOR_BGR2RGB',
+    'bgra': 'COLOR_BGR2BGRA',
+    'rgb565': 'COLOR_BGR2BGR565',
+}
+
+def parse_resolution(text):
+    """'1920x1080' 형식 문자열을 (width, height)로 변환 (argparse type)"""
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}'은(는) WIDTHxHEIGHT 형식이 아닙니다 (예: 800x480)")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"해상도는 0보다 커야 합니다: {text}")
+    return width, height
+
+def get_peak_memory_kb():
+    """프로세스 최대 메모리 사용량 (KB, Linux ru_maxrss 기준)"""
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+
+def benchmark_video(video_path, width=1920, height=1080, max_frames=None, convert='none',
+                    overlay=None):
+    """imshow 없이 디코드 → 리사이즈 → 변환 경로만 실행하고 성능 측정"""
+    if not load_cv2():
+        return None
+    if not os.path.exists(video_path):
+        print(f"\n❌ 오류: '{video_path}' 파일을 찾을 수 없습니다.")
+        return None
+    if convert not in PIXEL_CONVERSIONS:
+        print(f"❌ 지원하지 않는 변환 포맷: {convert} ({', '.join(PIXEL_CONVERSIONS)})")
+        return None
+    
+    memory_before = get_peak_memory_kb()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"❌ 영상을 열 수 없습니다: {video_path}")
+        return None
+    
+    code_name = PIXEL_CONVERSIONS[convert]
+    convert_code = getattr(cv2, code_name) if code_name else None
+    stages = {'decode': 0.0, 'resize': 0.0, 'overlay': 0.0, 'convert': 0.0}
+    frames = 0
+    
+    print(f"\n⏱️  벤치마크 시작: {video_path} → {width}x{height} (변환: {convert})")
+    started = time.perf_counter()
+    try:
+        while max_frames is None or frames < max_frames:
+            t0 = time.perf_counter()
+            ret, frame = cap.read()
+            t1 = time.perf_counter()
+            if not ret:
+                break
+            
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_LINEAR)
+            t2 = time.perf_counter()
+            
+            if overlay:
+                frame = overlay.apply(frame)
+            t3 = time.perf_counter()
+            
+            if convert_code is not None:
+                frame = cv2.cvtColor(frame, convert_code)
+            t4 = time.perf_counter()
+            
+            stages['decode'] += t1 - t0
+            stages['resize'] += t2 - t1
+            stages['overlay'] += t3 - t2
+            stages['convert'] += t4 - t3
+            frames += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+    elapsed = time.perf_counter() - started
+    
+    memory_after = get_peak_memory_kb()
+    result = {
+        'frames': frames,
+        'elapsed': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'stages_ms': {name: (total / frames * 1000 if frames else 0.0)
+                      for name, total in stages.items()},
+        'peak_memory_kb': memory_after,
+        'memory_growth_kb': (memory_after - memory_before
+                             if memory_before is not None and memory_after is not None else None),
+    }
+    
+    print(f"   프레임: {frames}개 / {elapsed:.2f}초 → {result['fps']:.1f} FPS")
+    for name, ms in result['stages_ms'].items():
+        print(f"   {name:>8}: {ms:.2f} ms/프레임")
+    if memory_after is not None:
+        print(f"   최대 메모리: {memory_after / 1024:.1f} MB (영상 처리 중 증가: {result['memory_growth_kb'] / 1024:.1f} MB)")
+    return result
+
 # ============================================================================
 # 메인
 # ============================================================================
 def main():
+    startup_timings.append(('기본 모듈 로딩', time.perf_counter() - PROCESS_START))
     print("\n" + "="*60)
     print("🌱 스마트 식물 관리 시스템 v2.0")
     print("="*60)
@@ -884,19 +1856,70 @@ def main():
     parser.add_argument('--no-video', action='store_true')
     parser.add_argument('--no-keypad', action='store_true', help='키패드 비활성화')
     parser.add_argument('--auto', action='store_true', help='자동 제어 켜기')
+    parser.add_argument('--control-doc', metavar='DOC_ID',
+                        help=f'Firestore {CONTROL_COLLECTION}/DOC_ID 문서를 직접 구독해서 장치 제어 (--firebase 필요)')
+    parser.add_argument('--framebuffer', nargs='?', const='/dev/fb0', metavar='DEVICE',
+                        help='X 없이 프레임버퍼로 출력 (기본: /dev/fb0)')
+    parser.add_argument('--fb-size', type=parse_resolution, default='1920x1080',
+                        help='장치에서 해상도를 읽을 수 없을 때 사용할 해상도')
+    parser.add_argument('--fb-bpp', type=int, default=32, choices=sorted(FB_PIXEL_FORMATS),
+                        help='장치에서 색 깊이를 읽을 수 없을 때 사용할 bpp')
+    parser.add_argument('--overlay', action='store_true', help='영상 위에 센서 값 표시')
+    parser.add_argument('--benchmark', action='store_true', help='화면 없이 영상 처리 성능 측정')
+    parser.add_argument('--bench-size', type=parse_resolution, default='1920x1080', help='벤치마크 목표 해상도 (예: 800x480)')
+    parser.add_argument('--bench-frames', type=int, help='벤치마크 최대 프레임 수')
+    parser.add_argument('--bench-convert', default='none', choices=list(PIXEL_CONVERSIONS),
+                        help='벤치마크 픽셀 포맷 변환')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='모듈 import/초기화 단계별 시작 시간 출력')
     
     args = parser.parse_args()
     
-    # Firebase 초기화
+    # 벤치마크 모드 (센서/API/Firebase 없이 영상 처리만)
+    if args.benchmark:
+        if not args.video_path:
+            print("❌ 벤치마크할 영상 파일을 지정하세요")
+            return
+        width, height = args.bench_size
+        overlay = None
+        if args.overlay:
+            # 벤치마크용 고정 샘플 데이터 (렌더링은 한 번만 발생)
+            sample = {'temperature': 24.5, 'humidity': 60.0, 'light_level': 512}
+            overlay = SensorOverlay(lambda: sample)
+        if args.startup_profile:
+            print_startup_profile()
+        benchmark_video(args.video_path, width, height, args.bench_frames, args.bench_convert,
+                        overlay)
+        return
+    
+    # Firebase/시리얼/API는 동시에 시작하고, 서로 필요한 곳에서만 준비 상태를 기다림
+    # Firebase 초기화 (백그라운드) - 준비 전에 읽은 센서 데이터는 대기열에 쌓임
     if args.firebase:
-        init_firebase(args.firebase)
+        readiness.begin('firebase')
+        Thread(target=start_firebase, args=(args.firebase,), daemon=True).start()
     
-    # 센서 모니터링
+    # 센서 모니터링 (Arduino 연결은 백그라운드)
     sensor_monitor = None
     if not args.no_sensor:
-        sensor_monitor = SensorMonitor(use_firebase=(firebase_db is not None))
+        sensor_monitor = SensorMonitor(use_firebase=bool(args.firebase))
         sensor_monitor.start()
     
+    # 내장 Firestore 제어 리스너 (Firebase 준비 후 시작)
+    control_listener = None
+    if args.control_doc and sensor_monitor:
+        control_listener = ControlListener(sensor_monitor, args.control_doc)
+        readiness.begin('control')
+        
+        def start_control_listener():
+            readiness.wait('firebase')
+            with timed('Firestore 제어 리스너 시작'):
+                # 대기 중에 종료가 시작되었으면 start()가 False를 반환
+                if control_listener.start():
+                    readiness.ready('control')
+                else:
+                    readiness.failed('control', '시작 실패')
+        Thread(target=start_control_listener, daemon=True).start()
+    
     # 자동 제어 활성화
     if args.auto:
         with auto_control_lock:
@@ -905,25 +1928,47 @@ def main():
     
     # API 서버
     if args.api:
-        api_server = APIServer(sensor_monitor)
-        api_server.start()
-        time.sleep(1)
+        with timed('API 서버 시작'):
+            api_server = APIServer(sensor_monitor)
+            api_server.start()
     
     # 영상 재생
     if not args.no_video and args.video_path:
+        if args.startup_profile:
+            load_cv2()  # 재생 전에 import 시간도 프로파일에 포함
+            print_startup_profile()
+        overlay = None
+        if args.overlay and sensor_monitor:
+            overlay = SensorOverlay(lambda: sensor_monitor.latest_data)
         try:
-            play_video(args.video_path, args.fullscreen, args.loop, args.api)
+            if args.framebuffer:
+                fb_width, fb_height = args.fb_size
+                play_video_framebuffer(args.video_path, args.framebuffer, args.loop, args.api,
+                                       (fb_width, fb_height, args.fb_bpp), overlay)
+            else:
+                play_video(args.video_path, args.fullscreen, args.loop, args.api, overlay)
         finally:
+            if control_listener:
+                control_listener.stop()
             if sensor_monitor:
                 sensor_monitor.stop()
     elif args.no_video:
+        if args.startup_profile:
+            print_startup_profile()
+        # 백그라운드 초기화 중일 수 있으므로 요청된 기능과 현재 준비 상태로 표시
+        def with_state(label, name):
+            state = readiness.state(name)
+            return label if state == 'ready' else f"{label}({STATE_LABELS.get(state, state)})"
+        
         status = "📊 센서 모니터링"
-        if firebase_db:
-            status += " + Firebase"
+        if args.firebase:
+            status += " + " + with_state("Firebase", 'firebase')
         if args.api:
-            status += " + API"
+            status += " + " + with_state("API", 'api')
         if args.auto:
             status += " + 🤖 자동 제어"
+        if control_listener:
+            status += " + " + with_state("📡 Firestore 제어", 'control')
         
         print(f"\n{status} 실행 중..")
         print("Ctrl+C로 종료하세요\n")
@@ -931,6 +1976,8 @@ def main():
             while True:
                 time.sleep(1)
         except KeyboardInterrupt:
+            if control_listener:
+                control_listener.stop()
             if sensor_monitor:
                 sensor_monitor.stop()
 
@@ -0,0 +1,263 @@
+"""
+I2C sensor drivers for the Raspberry Pi examples.
+
+Each device is configured once (power on, measurement time, continuous mode) and
+afterwards only read. Reads are plain I2C read transactions with no command byte,
+so the device keeps measuring in the background and is never re-triggered.
+SensorBus reads every registered device in a single i2c_rdwr transaction.
+
+FakeSMBus simulates the bus and a BH1750 so the drivers can be tested and
+benchmarked without hardware:
+
+  python3 i2c_sensors.py            # benchmark driver reads vs. legacy per-read mode writes
+
+Requires smbus2 on real hardware (pip install smbus2).
+"""
+
+import time
+
+try:
+    from smbus2 import SMBus, i2c_msg
+except ImportError:
+    SMBus = None
+    i2c_msg = None
+
+
+class _I2cMsg:
+    """Minimal stand-in for smbus2.i2c_msg when smbus2 isn't installed (fake bus only)."""
+
+    def __init__(self, addr, length):
+        self.addr = addr
+        self.len = length
+        self.buf = bytes(length)
+
+    @classmethod
+    def read(cls, addr, length):
+        return cls(addr, length)
+
+    def __iter__(self):
+        return iter(self.buf)
+
+
+def read_msg(addr, length):
+    return (i2c_msg or _I2cMsg).read(addr, length)
+
+
+# ==================== BH1750 ====================
+
+BH1750_POWER_ON = 0x01
+BH1750_RESET = 0x07
+BH1750_MODES = {
+    "high": 0x10,   # 1 lx resolution, 120 ms at default MTreg
+    "high2": 0x11,  # 0.5 lx resolution, 120 ms at default MTreg
+    "low": 0x13,    # 4 lx resolution, 16 ms at default MTreg
+}
+BH1750_DEFAULT_MTREG = 69
+BH1750_MTREG_RANGE = (31, 254)
+
+
+class BH1750:
+    """BH1750 ambient light sensor in continuous measurement mode.
+
+    Args:
+        bus: smbus2.SMBus (or FakeSMBus)
+        address: 0x23 (ADDR low) or 0x5C (ADDR high)
+        mode: "high", "high2" or "low"
+        mtreg: measurement time register (31-254). Higher is more sensitive and slower.
+    """
+
+    name = "lux"
+
+    def __init__(self, bus, address=0x23, mode="high", mtreg=BH1750_DEFAULT_MTREG):
+        if mode not in BH1750_MODES:
+            raise ValueError(f"unknown BH1750 mode: {mode}")
+        low, high = BH1750_MTREG_RANGE
+        if not low <= mtreg <= high:
+            raise ValueError(f"mtreg must be between {low} and {high}")
+        self.bus = bus
+        self.address = address
+        self.mode = mode
+        self.mtreg = mtreg
+        self.ready_at = None
+
+    @property
+    def measurement_time(self):
+        """Seconds per conversion for the configured mode and MTreg."""
+        base = 0.016 if self.mode == "low" else 0.12
+        return base * self.mtreg / BH1750_DEFAULT_MTREG
+
+    def configure(self):
+        """Power on, set the measurement time and start continuous measurement (once)."""
+        self.bus.write_byte(self.address, BH1750_POWER_ON)
+        self.bus.write_byte(self.address, 0x40 | (self.mtreg >> 5))
+        self.bus.write_byte(self.address, 0x60 | (self.mtreg & 0x1F))
+        self.bus.write_byte(self.address, BH1750_MODES[self.mode])
+        # The first result is only valid after one full conversion
+        self.ready_at = time.monotonic() + self.measurement_time
+
+    def read_message(self):
+        return read_msg(self.address, 2)
+
+    def decode(self, data):
+        data = list(data)
+        raw = data[0] << 8 | data[1]
+        lux = raw / 1.2 * (BH1750_DEFAULT_MTREG / self.mtreg)
+        if self.mode == "high2":
+            lux /= 2
+        return lux
+
+    def wait_ready(self):
+        if self.ready_at is None:
+            self.configure()
+        remaining = self.ready_at - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def read(self):
+        """Latest continuous-mode result in lux."""
+        self.wait_ready()
+        msg = self.read_message()
+        self.bus.i2c_rdwr(msg)
+        return self.decode(msg)
+
+
+class SensorBus:
+    """Configures devices once and reads them all in one i2c_rdwr transaction."""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.devices = []
+
+    def add(self, device):
+        device.configure()
+        self.devices.append(device)
+        return device
+
+    def read_all(self):
+        """Return {device.name: value} for every device."""
+        if not self.devices:
+            return {}
+        for device in self.devices:
+            device.wait_ready()
+        msgs = [device.read_message() for device in self.devices]
+        self.bus.i2c_rdwr(*msgs)
+        return {device.name: device.decode(msg) for device, msg in zip(self.devices, msgs)}
+
+
+# ==================== Fake bus ====================
+
+class FakeBH1750Device:
+    """Simulated BH1750 register state on a FakeSMBus."""
+
+    def __init__(self, lux_fn):
+        self.lux_fn = lux_fn
+        self.powered = False
+        self.mode = None
+        self.mtreg = BH1750_DEFAULT_MTREG
+        self.mode_writes = 0
+
+    def write(self, value):
+        if value == BH1750_POWER_ON:
+            self.powered = True
+        elif value == 0x00:
+            self.powered = False
+        elif value & 0xF8 == 0x40:
+            self.mtreg = (self.mtreg & 0x1F) | ((value & 0x07) << 5)
+        elif value & 0xE0 == 0x60:
+            self.mtreg = (self.mtreg & 0xE0) | (value & 0x1F)
+        elif value in BH1750_MODES.values():
+            self.mode = value
+            self.powered = True
+            self.mode_writes += 1
+
+    def read(self, length):
+        if self.mode is None:
+            return bytes(length)  # no measurement has run yet
+        raw = int(self.lux_fn() * 1.2 * self.mtreg / BH1750_DEFAULT_MTREG)
+        if self.mode == BH1750_MODES["high2"]:
+            raw *= 2
+        raw = max(0, min(0xFFFF, raw))
+        return bytes([raw >> 8, raw & 0xFF])[:length]
+
+
+class FakeSMBus:
+    """In-memory stand-in for smbus2.SMBus.
+
+    Each call counts as one bus transaction and costs `latency` seconds, which
+    makes per-read overhead visible in benchmarks.
+    """
+
+    def __init__(self, latency=0.0003):
+        self.latency = latency
+        self.devices = {}
+        self.transactions = 0
+
+    def attach(self, address, device):
+        self.devices[address] = device
+        return device
+
+    def _transaction(self):
+        self.transactions += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _device(self, address):
+        if address not in self.devices:
+            raise OSError(121, "Remote I/O error")  # same errno as a missing I2C device
+        return self.devices[address]
+
+    def write_byte(self, address, value):
+        self._transaction()
+        self._device(address).write(value)
+
+    def read_i2c_block_data(self, address, register, length):
+        # SMBus block reads send the register byte first (0x00 powers a BH1750 down)
+        self._transaction()
+        device = self._device(address)
+        device.write(register)
+        return list(device.read(length))
+
+    def i2c_rdwr(self, *msgs):
+        self._transaction()
+        for msg in msgs:
+            msg.buf = self._device(msg.addr).read(msg.len)
+
+    def close(self):
+        pass
+
+
+def fake_bh1750_bus(address=0x23, lux_fn=lambda: 120 + (time.time() % 30 - 15) * 2):
+    """A FakeSMBus with one simulated BH1750 attached."""
+    bus = FakeSMBus()
+    bus.attach(address, FakeBH1750Device(lux_fn))
+    return bus
+
+
+def benchmark(reads=20):
+    """Compare legacy per-read mode writes against the continuous-mode driver."""
+    bus = fake_bh1750_bus()
+    started = time.perf_counter()
+    for _ in range(reads):
+        bus.write_byte(0x23, 0x10)
+        time.sleep(0.2)
+        bus.read_i2c_block_data(0x23, 0x00, 2)
+    legacy = (time.perf_counter() - started) / reads
+    legacy_tx = bus.transactions
+
+    bus = fake_bh1750_bus()
+    sensors = SensorBus(bus)
+    sensors.add(BH1750(bus))
+    sensors.read_all()  # includes the one-time first conversion wait
+    setup_tx = bus.transactions
+    started = time.perf_counter()
+    for _ in range(reads):
+        sensors.read_all()
+    driver = (time.perf_counter() - started) / reads
+
+    print(f"legacy: {legacy * 1000:.2f} ms/read, {legacy_tx / reads:.1f} transactions/read")
+    print(f"driver: {driver * 1000:.2f} ms/read, {(bus.transactions - setup_tx) / reads:.1f} transactions/read "
+          f"(+{setup_tx} setup)")
+
+
+if __name__ == "__main__":
+    benchmark()
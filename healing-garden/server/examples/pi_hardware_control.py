@@ -1,31 +1,80 @@
 #!/usr/bin/env python3
 """
 Raspberry Pi Hardware Control with Firebase Firestore
-라즈베리파이에서 Firestore의 device_control 문서를 실시간으로 모니터링하고
+라즈베리파이에서 Firestore의 device_control 컬렉션을 실시간으로 모니터링하고
 API를 통해 환기팬, 워터펌프, LED 조명을 제어합니다.
 
+하나의 프로세스가 컬렉션 전체를 감시하며, 각 문서(테라리움)는 매핑 테이블
+(TERRARIUM_API_URLS / TERRARIUM_MAP_FILE)에 따라 해당 테라리움의 API 서버로 전달됩니다.
+매핑에 없는 문서는 무시합니다.
+
 API 엔드포인트:
 - POST /api/control/fan
 - POST /api/control/pump
 - POST /api/control/light
 
+변경된 필드만 전송하고 (장치별 마지막 적용 상태 기억), 서로 다른 장치는
+keep-alive 세션 풀을 통해 동시에 요청합니다.
+Firestore 리스너는 장치별 슬롯에 최신 상태만 기록하고 바로 반환하며,
+장치별 워커가 슬롯을 비우면서 가장 최근 값만 API로 보냅니다 (latest-wins).
+API 호출이 실패하면 지수 백오프 + 지터로 재시도하고 (그 사이 새 값이 오면 새 값만
+보냄), API가 복구되면 제어 문서를 다시 읽어 전체 상태를 맞춥니다 (reconcile).
+
+각 장치 명령에는 trace id와 단계별 시각(Firestore 쓰기, 리스너, HTTP 전송)이
+X-Trace-Id / X-Trace-Stages 헤더로 실려 가고, API 서버가 시리얼 응답까지 기록해
+GET /api/trace/report 에서 구간별 지연을 보여줍니다.
+
+Firebase 없이 테스트하려면: python3 pi_hardware_control.py --fake
+(로컬 가짜 Firestore가 주기적으로 제어 문서를 바꾸고 FAKE_API_BASE_URL로 전송)
+
 설치 필요 패키지:
 pip3 install firebase-admin requests
 """
 
-import firebase_admin
-from firebase_admin import credentials, firestore
+try:
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    FIREBASE_AVAILABLE = True
+except ImportError:
+    FIREBASE_AVAILABLE = False  # --fake 모드는 firebase-admin 없이 실행 가능
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import sys
+import json
+import os
+import threading
+import random
+import uuid
+import queue
 from datetime import datetime
 
 # API 서버 설정
 API_BASE_URL = "http://172.21.166.166:5000"  # 실제 API 서버 주소로 변경
+API_TIMEOUT = 5
+
+# Firestore 제어 컬렉션과 문서 ID → 테라리움 API 서버 매핑
+CONTROL_COLLECTION = 'device_control'
+TERRARIUM_API_URLS = {
+    'rosemary_terrarium': API_BASE_URL,
+}
+# {"문서 ID": "http://..."} 형식의 JSON 파일이 있으면 위 매핑에 추가
+TERRARIUM_MAP_FILE = '/home/pi/terrariums.json'
+
+# --fake 모드에서 사용할 로컬 API 서버
+FAKE_API_BASE_URL = "http://localhost:5000"
+
+# 장치별 동시 요청을 위한 keep-alive 세션 (연결 재사용)
+http_session = requests.Session()
+http_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+http_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
 
 # Firebase 초기화
 def init_firebase():
     """Firebase Admin SDK 초기화"""
+    if not FIREBASE_AVAILABLE:
+        print("❌ firebase-admin이 설치되지 않았습니다 (pip3 install firebase-admin)")
+        sys.exit(1)
     try:
         # Service Account Key 파일 경로 (실제 경로로 변경 필요)
         cred = credentials.Certificate('/home/pi/serviceAccountKey.json')
@@ -38,19 +87,21 @@ def init_firebase():
         sys.exit(1)
 
 # API를 통한 장치 제어
-def control_device_api(device_type, state):
+def control_device_api(device_type, state, base_url=API_BASE_URL, headers=None):
     """
     API를 통해 장치를 ON/OFF 제어
     
     Args:
         device_type: 'fan', 'pump', 'light'
         state: True(ON) / False(OFF)
+        base_url: 테라리움 API 서버 주소
+        headers: 추가 HTTP 헤더 (trace 정보)
     """
     try:
-        endpoint = f"{API_BASE_URL}/api/control/{device_type}"
+        endpoint = f"{base_url}/api/control/{device_type}"
         payload = {"state": state}
         
-        response = requests.post(endpoint, json=payload, timeout=5)
+        response = http_session.post(endpoint, json=payload, headers=headers, timeout=API_TIMEOUT)
         
         if response.status_code == 200:
             status = "ON" if state else "OFF"
@@ -67,18 +118,20 @@ def control_device_api(device_type, state):
         return False
 
 # LED 밝기 제어
-def control_led_brightness_api(brightness):
+def control_led_brightness_api(brightness, base_url=API_BASE_URL, headers=None):
     """
     API를 통해 LED 밝기 제어 (0-255)
     
     Args:
         brightness: 0 (OFF) ~ 255 (최대 밝기)
+        base_url: 테라리움 API 서버 주소
+        headers: 추가 HTTP 헤더 (trace 정보)
     """
     try:
-        endpoint = f"{API_BASE_URL}/api/control/light/brightness"
+        endpoint = f"{base_url}/api/control/light/brightness"
         payload = {"brightness": brightness}
         
-        response = requests.post(endpoint, json=payload, timeout=5)
+        response = http_session.post(endpoint, json=payload, headers=headers, timeout=API_TIMEOUT)
         
         if response.status_code == 200:
             if brightness == 0:
@@ -94,76 +147,393 @@ def control_led_brightness_api(brightness):
         print(f"❌ LED API 연결 실패: {e}")
         return False
 
-# Firestore 실시간 리스너
-def on_snapshot(doc_snapshot, changes, read_time):
+# Firestore 필드 → 장치 제어 함수 (value, base_url, headers)
+DEVICE_HANDLERS = {
+    'fan': lambda value, base_url, headers: control_device_api('fan', value, base_url, headers),
+    'water_pump': lambda value, base_url, headers: control_device_api('pump', value, base_url, headers),
+    'led_brightness': control_led_brightness_api,
+}
+
+def new_trace(update_time=None):
     """
-    Firestore 문서 변경 감지 시 호출되는 콜백 함수
+    스냅샷 하나에 대한 trace 시작 (id, 단계 목록)
+    
+    Args:
+        update_time: Firestore 문서의 update_time (쓰기 시각, datetime)
     """
-    for doc in doc_snapshot:
-        if doc.exists:
-            data = doc.to_dict()
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            print(f"\n📡 [{timestamp}] Firestore 업데이트 감지")
-            print(f"   문서 ID: {doc.id}")
-            
-            # 환기팬 제어
-            if 'fan' in data:
-                control_device_api('fan', data['fan'])
-            
-            # 워터펌프 제어
-            if 'water_pump' in data:
-                control_device_api('pump', data['water_pump'])
+    stages = []
+    if update_time is not None:
+        try:
+            stages.append(('firestore_write', update_time.timestamp()))
+        except (AttributeError, ValueError):
+            pass
+    stages.append(('listener', time.time()))
+    return uuid.uuid4().hex[:12], stages
+
+def trace_headers(trace_id, stages):
+    return {'X-Trace-Id': trace_id, 'X-Trace-Stages': json.dumps(stages)}
+
+# 실패한 장치 제어 재시도 (지수 백오프 + 지터)
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+def retry_delay(attempt):
+    """attempt번째 재시도까지 기다릴 시간 (0.5~1.5배 지터)"""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+    return delay * random.uniform(0.5, 1.5)
+
+# 장치를 모두 끈 상태 (초기 기본값 / 종료 시)
+DEVICES_OFF = {'fan': False, 'water_pump': False, 'led_brightness': 0}
+
+class DeviceDispatcher:
+    """
+    장치별 latest-wins 슬롯 + 장치별 워커
+    
+    submit()은 슬롯에 원하는 상태를 덮어쓰고 즉시 반환합니다. 장치마다 워커 스레드가
+    하나씩 있어 같은 장치의 요청 순서는 유지되고, 느린 장치가 다른 장치를 막지 않습니다.
+    워커는 마지막으로 적용된 상태와 다를 때만 API를 호출합니다.
+    
+    슬롯은 장치마다 하나뿐이라 아웃박스 크기는 장치 수로 제한됩니다. 실패한 값은
+    백오프 후 같은 슬롯에서 재시도되며, 그 사이 새 값이 들어오면 재시도 대신 새 값이
+    바로 전송됩니다. 실패하던 장치가 모두 복구되면 on_recover()가 호출됩니다.
+    """
+    
+    def __init__(self, base_url=API_BASE_URL, handlers=DEVICE_HANDLERS, name='',
+                 on_recover=None):
+        self.base_url = base_url
+        self.handlers = handlers
+        self.on_recover = on_recover
+        self.applied = {}
+        self.slots = {}      # 필드 → (원하는 값, force, 전송 가능 시각)
+        self.attempts = {}   # 필드 → 연속 실패 횟수
+        self.busy = set()    # 지금 API 호출 중인 필드
+        self.coalesced = 0   # 전송되기 전에 덮어쓰인 중간 값 수
+        self.running = True
+        self.cond = threading.Condition()
+        self.workers = [
+            threading.Thread(target=self._worker, args=(field,), daemon=True,
+                             name=f'device-{name}-{field}')
+            for field in handlers
+        ]
+        for worker in self.workers:
+            worker.start()
+    
+    def submit(self, data, force=False, trace=None):
+        """
+        data의 장치 필드를 슬롯에 기록하고 바로 반환 (Firestore 리스너 스레드용)
+        
+        Args:
+            data: Firestore 문서 데이터
+            force: True면 마지막 상태와 같아도 전송 (초기화/종료 시)
+            trace: new_trace()의 (trace id, 단계 목록) - 장치별로 따로 추적됨
+        """
+        with self.cond:
+            for field in self.handlers:
+                if field in data:
+                    field_force = force
+                    if field in self.slots:
+                        self.coalesced += 1
+                        # 덮어써도 대기 중이던 강제 전송(재동기화 등)은 유지
+                        field_force = force or self.slots[field][1]
+                    field_trace = None
+                    if trace:
+                        field_trace = (f"{trace[0]}-{field}", list(trace[1]))
+                    self.slots[field] = (data[field], field_force, 0.0, field_trace)
+            self.cond.notify_all()
+    
+    def wait_idle(self, timeout=None):
+        """모든 슬롯이 비고 진행 중인 요청이 없을 때까지 대기"""
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.slots and not self.busy, timeout)
+    
+    def apply(self, data, force=False, timeout=None):
+        """submit() 후 전송이 끝날 때까지 대기 (초기 상태 적용/종료 시)"""
+        self.submit(data, force)
+        return self.wait_idle(timeout)
+    
+    def _worker(self, field):
+        handler = self.handlers[field]
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: field in self.slots or not self.running)
+                if field not in self.slots:
+                    return
+                value, force, not_before, trace = self.slots[field]
+                delay = not_before - time.monotonic()
+                if delay > 0:
+                    if not self.running:
+                        return  # 종료 중에는 재시도 대기 중인 값을 버림
+                    # 재시도 대기 (새 값이 submit되면 깨어나서 바로 전송)
+                    self.cond.wait(delay)
+                    continue
+                del self.slots[field]
+                if not force and field in self.applied and self.applied[field] == value:
+                    self.cond.notify_all()
+                    continue
+                self.busy.add(field)
             
-            # LED 밝기 제어
-            if 'led_brightness' in data:
-                brightness = data.get('led_brightness', 0)
-                control_led_brightness_api(brightness)
+            headers = None
+            if trace:
+                trace_id, stages = trace
+                headers = trace_headers(trace_id, stages + [('dispatch', time.time())])
+            try:
+                ok = bool(handler(value, self.base_url, headers))
+            except Exception as e:
+                print(f"❌ 장치 제어 오류 ({field}): {e}")
+                ok = False
             
-            # LED 색상 정보 (참고용 로그)
-            if 'led_color' in data:
-                print(f"🎨 LED 색상: {data['led_color']}")
+            recovered = False
+            with self.cond:
+                if ok:
+                    self.applied[field] = value
+                    if self.attempts.pop(field, 0):
+                        recovered = not self.attempts
+                else:
+                    attempt = self.attempts.get(field, 0) + 1
+                    self.attempts[field] = attempt
+                    # 더 새로운 값이 이미 들어와 있으면 실패한 값은 재시도하지 않음
+                    if field not in self.slots and self.running:
+                        delay = retry_delay(attempt)
+                        self.slots[field] = (value, force, time.monotonic() + delay, trace)
+                        print(f"   🔁 {field} 재시도 예정: {delay:.1f}초 후 ({attempt}번째 실패)")
+                self.busy.discard(field)
+                self.cond.notify_all()
             
-            print("-" * 50)
+            if recovered and self.on_recover:
+                print(f"✅ API 복구됨: {self.base_url}")
+                threading.Thread(target=self.on_recover, daemon=True).start()
+    
+    def shutdown(self, timeout=None):
+        self.wait_idle(timeout)
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        for worker in self.workers:
+            worker.join(timeout)
+        if self.coalesced:
+            print(f"   합쳐진(건너뛴) 중간 상태: {self.coalesced}개")
+
+def load_terrarium_map():
+    """코드의 매핑 테이블에 TERRARIUM_MAP_FILE 내용을 합쳐서 반환"""
+    mapping = dict(TERRARIUM_API_URLS)
+    if TERRARIUM_MAP_FILE and os.path.exists(TERRARIUM_MAP_FILE):
+        try:
+            with open(TERRARIUM_MAP_FILE, 'r', encoding='utf-8') as f:
+                mapping.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 매핑 파일 읽기 실패 ({TERRARIUM_MAP_FILE}): {e}")
+    return mapping
+
+class FleetRouter:
+    """
+    컬렉션 문서를 테라리움별 DeviceDispatcher로 라우팅
+    
+    테라리움마다 자기 워커를 가지므로 테라리움/장치별 순서가 유지되고,
+    한 테라리움의 API 서버가 느려도 다른 테라리움에는 영향이 없습니다.
+    """
+    
+    def __init__(self, mapping, db=None):
+        self.mapping = mapping
+        self.db = db
+        self.dispatchers = {}
+        self.lock = threading.Lock()
+    
+    def reconcile(self, doc_id):
+        """제어 문서를 다시 읽어 해당 테라리움의 전체 상태를 다시 적용"""
+        if not self.db:
+            return
+        try:
+            doc = self.db.collection(CONTROL_COLLECTION).document(doc_id).get()
+        except Exception as e:
+            print(f"⚠️ 상태 재확인 실패 ({doc_id}): {e}")
+            return
+        if doc.exists:
+            print(f"🔄 상태 재확인: {doc_id}")
+            # API 서버가 재시작됐을 수 있으므로 장치 상태를 모두 다시 전송
+            self.dispatchers[doc_id].submit({**DEVICES_OFF, **(doc.to_dict() or {})}, force=True)
+    
+    def route(self, doc_id, data, trace=None):
+        base_url = self.mapping.get(doc_id)
+        if not base_url:
+            print(f"   ⚠️ 매핑되지 않은 테라리움 문서 무시: {doc_id}")
+            return
+        
+        with self.lock:
+            dispatcher = self.dispatchers.get(doc_id)
+            first_seen = dispatcher is None
+            if first_seen:
+                dispatcher = DeviceDispatcher(base_url, name=doc_id,
+                                              on_recover=lambda: self.reconcile(doc_id))
+                self.dispatchers[doc_id] = dispatcher
+        
+        if first_seen:
+            # 처음 보는 테라리움: 장치의 실제 상태를 모르므로 모두 전송
+            dispatcher.submit({**DEVICES_OFF, **data}, force=True, trace=trace)
+        else:
+            dispatcher.submit(data, trace=trace)
+    
+    def shutdown(self, timeout=None):
+        """모든 테라리움 장치를 끄고 워커 종료"""
+        with self.lock:
+            dispatchers = list(self.dispatchers.values())
+        for dispatcher in dispatchers:
+            dispatcher.submit(DEVICES_OFF, force=True)
+        for dispatcher in dispatchers:
+            dispatcher.shutdown(timeout)
+
+router = None
+
+# Firestore 실시간 리스너
+def on_snapshot(col_snapshot, changes, read_time):
+    """
+    Firestore 컬렉션 변경 감지 시 호출되는 콜백 함수
+    (첫 호출에는 모든 문서가 ADDED로 전달되어 초기 상태가 적용됨)
+    """
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    for change in changes:
+        if change.type.name == 'REMOVED':
+            continue
+        doc = change.document
+        trace = new_trace(getattr(doc, 'update_time', None))
+        data = doc.to_dict() or {}
+        print(f"\n📡 [{timestamp}] Firestore 업데이트 감지")
+        print(f"   문서 ID: {doc.id}")
+        
+        # 환기팬 / 워터펌프 / LED 밝기 - 슬롯에 최신 값만 기록하고 바로 반환
+        router.route(doc.id, data, trace)
+        
+        # LED 색상 정보 (참고용 로그)
+        if 'led_color' in data:
+            print(f"🎨 LED 색상: {data['led_color']}")
+        
+        print("-" * 50)
+
+# ============================================================================
+# 로컬 가짜 Firestore (--fake, Firebase 없이 지연 추적/제어 경로 테스트용)
+# ============================================================================
+class FakeDocumentSnapshot:
+    def __init__(self, doc_id, data, update_time):
+        self.id = doc_id
+        self.exists = True
+        self.update_time = update_time
+        self._data = dict(data)
+    
+    def to_dict(self):
+        return dict(self._data)
+
+class FakeChange:
+    class type:
+        name = 'MODIFIED'
+    
+    def __init__(self, document):
+        self.document = document
+
+class FakeDocumentRef:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+    
+    def get(self):
+        data, update_time = self.collection.docs.get(self.id, ({}, None))
+        snapshot = FakeDocumentSnapshot(self.id, data, update_time)
+        snapshot.exists = self.id in self.collection.docs
+        return snapshot
+    
+    def set(self, data, merge=False):
+        self.collection.write(self.id, data, merge)
+
+class FakeWatch:
+    def __init__(self, collection, callback):
+        self.collection = collection
+        self.callback = callback
+    
+    def unsubscribe(self):
+        self.collection.listeners.remove(self.callback)
+
+class FakeCollection:
+    """document().set()의 변경을 실제 Firestore처럼 하나의 리스너 스레드에서 순서대로 전달"""
+    
+    def __init__(self):
+        self.docs = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.events = queue.Queue()
+        threading.Thread(target=self._deliver, daemon=True).start()
+    
+    def _deliver(self):
+        while True:
+            snapshot = self.events.get()
+            for callback in list(self.listeners):
+                callback([snapshot], [FakeChange(snapshot)], snapshot.update_time)
+    
+    def document(self, doc_id):
+        return FakeDocumentRef(self, doc_id)
+    
+    def write(self, doc_id, data, merge=False):
+        with self.lock:
+            current = dict(self.docs.get(doc_id, ({}, None))[0]) if merge else {}
+            current.update(data)
+            update_time = datetime.now().astimezone()
+            self.docs[doc_id] = (current, update_time)
+        self.events.put(FakeDocumentSnapshot(doc_id, current, update_time))
+    
+    def on_snapshot(self, callback):
+        self.listeners.append(callback)
+        return FakeWatch(self, callback)
+
+class FakeFirestore:
+    def __init__(self):
+        self.collections = {}
+    
+    def collection(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+def run_fake_writer(db, doc_id, interval=2.0):
+    """앱 대신 주기적으로 제어 문서를 바꾸는 테스트용 쓰기 루프 (슬라이더 연타 포함)"""
+    doc_ref = db.collection(CONTROL_COLLECTION).document(doc_id)
+    fan = False
+    while True:
+        fan = not fan
+        doc_ref.set({'fan': fan}, merge=True)
+        for brightness in range(0, 256, 32):
+            doc_ref.set({'led_brightness': brightness}, merge=True)
+            time.sleep(0.02)
+        time.sleep(interval)
 
 def main():
     """메인 실행 함수"""
+    global router
     print("=" * 50)
     print("🌿 Healing Garden - Hardware Control System (API Mode)")
     print("=" * 50)
     
-    # Firebase 초기화
-    db = init_firebase()
-    
-    print(f"🔗 API 서버: {API_BASE_URL}")
+    fake = '--fake' in sys.argv
+    if fake:
+        # 로컬 가짜 Firestore + 로컬 API 서버
+        print("🧪 가짜 Firestore 모드")
+        db = FakeFirestore()
+        mapping = {'rosemary_terrarium': FAKE_API_BASE_URL}
+    else:
+        # Firebase 초기화
+        db = init_firebase()
+        mapping = load_terrarium_map()
     
-    # Firestore 문서 경로
-    doc_ref = db.collection('device_control').document('rosemary_terrarium')
+    router = FleetRouter(mapping, db)
+    print(f"🔗 테라리움 API 서버 ({len(mapping)}개):")
+    for doc_id, base_url in mapping.items():
+        print(f"   - {doc_id} → {base_url}")
     
     print("\n🔄 실시간 모니터링 시작...")
-    print("   Firestore: device_control/rosemary_terrarium")
+    print(f"   Firestore: {CONTROL_COLLECTION}/*")
     print("   Ctrl+C를 눌러 종료\n")
     
-    # 초기 상태 읽기
-    try:
-        doc = doc_ref.get()
-        if doc.exists:
-            data = doc.to_dict()
-            print("📊 초기 상태:")
-            print(f"   - 환기팬: {'ON' if data.get('fan') else 'OFF'}")
-            print(f"   - 워터펌프: {'ON' if data.get('water_pump') else 'OFF'}")
-            print(f"   - LED 밝기: {data.get('led_brightness', 0)}")
-            print(f"   - LED 색상: {data.get('led_color', 'N/A')}")
-            print()
-            
-            # 초기 상태 적용
-            control_device_api('fan', data.get('fan', False))
-            control_device_api('pump', data.get('water_pump', False))
-            control_led_brightness_api(data.get('led_brightness', 0))
-    except Exception as e:
-        print(f"⚠️ 초기 상태 읽기 실패: {e}")
+    # 실시간 리스너 등록 (컬렉션 전체)
+    col_watch = db.collection(CONTROL_COLLECTION).on_snapshot(on_snapshot)
     
-    # 실시간 리스너 등록
-    doc_watch = doc_ref.on_snapshot(on_snapshot)
+    if fake:
+        threading.Thread(target=run_fake_writer, args=(db, 'rosemary_terrarium'),
+                         daemon=True).start()
+        print(f"   지연 통계: {FAKE_API_BASE_URL}/api/trace/report\n")
     
     try:
         # 계속 실행 (Ctrl+C로 종료)
@@ -173,9 +543,8 @@ def main():
         print("\n\n🛑 프로그램 종료 중...")
         
         # 모든 장치 OFF (API 호출)
-        control_device_api('fan', False)
-        control_device_api('pump', False)
-        control_led_brightness_api(0)
+        col_watch.unsubscribe()
+        router.shutdown(timeout=API_TIMEOUT * 2)
         print("   모든 장치 OFF")
         
         print("✅ 안전하게 종료되었습니다.")
@@ -2,35 +2,94 @@
 """
 Simple Raspberry Pi LCD video client example.
 
-This script polls the server for LCD commands and executes them using an available
+This script receives LCD commands from the server and executes them using an available
 command-line player (cvlc/mpv/omxplayer). It is intentionally simple and meant as a
-starting point. Improve it with a robust supervisor (systemd), WebSockets, auth,
-and safety checks for production.
+starting point. Improve it with a robust supervisor (systemd), auth, and safety checks
+for production.
 
 Usage:
   1) Install a player, e.g. vlc (cvlc) or mpv or omxplayer.
      On Raspberry Pi OS (buster/stretch): sudo apt install vlc or sudo apt install mpv
-  2) Update SERVER_URL and TERRARIUM_ID below.
+  2) Update SERVER_URL and TERRARIUM_ID below (or pass --server / --id).
   3) Run: python3 pi_lcd_client.py
 
+  Several clients can run on one machine for testing synchronized playback, e.g.
+    python3 pi_lcd_client.py --id 0 &
+    python3 pi_lcd_client.py --id 1 --vlc-port 4213 &
+  Each instance uses its own mpv IPC socket (derived from --id).
+
 Behavior:
-  - Polls GET /lcd/:id/last every second. When a new command is present, executes it.
-  - Supported actions: play (with url), pause, stop, set_url, set_volume.
-  - For 'play' the script will start the player subprocess. For 'pause' it tries to
-    toggle pause if supported (mpv/cvlc remote controls). This is a lightweight demo.
+  - Subscribes to GET /lcd/:id/events (Server-Sent Events) over one persistent HTTP
+    session, so commands arrive as soon as they are posted and idle displays only
+    see a heartbeat. If the server has no SSE endpoint it falls back to long-polling
+    GET /lcd/:id/last?since=...&wait=..., and then to plain polling every POLL_INTERVAL.
+    Dropped connections are retried with exponential backoff.
+  - Supported actions: play (with url), pause, resume, stop, set_url, set_volume,
+    seek (with position in seconds).
+  - Synchronized playback: a play/set_url command with startAt (server time in ms)
+    and optional offset (clip position in seconds) is preloaded paused and started
+    when the server clock reaches startAt. The client estimates its offset to the
+    server clock with NTP-style exchanges against GET /time and, with mpv, keeps
+    nudging the playback speed (or seeks, for large errors) to hold the shared
+    timeline. Other players only get a synchronized start.
+  - Videos are cached on disk (CACHE_DIR, keyed by URL, stored with their ETag) and
+    evicted least-recently-used once CACHE_MAX_BYTES is exceeded. The first play of
+    a clip streams it while a background download fills the cache (interrupted
+    downloads resume with a Range request); later plays use the local file.
+  - mpv and VLC are started once and kept running: mpv is driven over its JSON IPC
+    socket and VLC over its RC interface, so play/set_url/pause/seek/volume are
+    messages to the running player instead of a restart. omxplayer (or any other
+    player) falls back to one process per clip with SIGSTOP/SIGCONT pause.
 """
 
 import time
+import json
+import os
+import hashlib
+import threading
 import requests
 import subprocess
 import shlex
 import shutil
+import signal
+import socket
 import sys
+from urllib.parse import urljoin
 
 SERVER_URL = "http://localhost:3000"  # Change to your server's address
 TERRARIUM_ID = "0"  # Match the terrarium id the app uses when sending commands
 POLL_INTERVAL = 1.0
 
+# Command delivery: "sse", "longpoll" or "poll". Falls back in that order when the
+# server does not support a mode.
+DELIVERY_MODE = "sse"
+LONG_POLL_WAIT = 25  # seconds the server may hold a long-poll request
+SSE_READ_TIMEOUT = 90  # server heartbeat is every 30 s; treat longer silence as a dead link
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 30.0
+
+# Local media cache, one directory per terrarium id so several clients on one
+# machine never share index or partial files. Set CACHE_DIR = None to always stream.
+CACHE_DIR = os.path.expanduser("~/.cache/terrarium-lcd/{id}")
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+CACHE_REVALIDATE_INTERVAL = 300  # seconds before a cached file's ETag is checked again
+# Upload URLs the server hands out are relative to SERVER_URL ("/static/videos/<file>");
+# any other source without a scheme is a local path and is played as-is.
+SERVER_MEDIA_PREFIX = "/static/"
+
+# Player IPC endpoints (mpv JSON IPC socket, VLC RC interface port)
+MPV_IPC_SOCKET = "/tmp/terrarium-lcd-mpv-{id}.sock"
+VLC_RC_PORT = 4212
+
+# Synchronized playback
+SYNC_CLOCK_REFRESH = 60  # seconds between clock offset estimates
+SYNC_CLOCK_SAMPLES = 8  # exchanges per estimate; the lowest-RTT one wins
+SYNC_CLOCK_RETRY_MIN = 2  # seconds before retrying a failed estimate (doubles up to SYNC_CLOCK_REFRESH)
+SYNC_CHECK_INTERVAL = 1.0  # seconds between drift checks
+SYNC_SEEK_THRESHOLD = 0.5  # drift (s) corrected by seeking instead of speed nudging
+SYNC_GAIN = 0.25  # speed change per second of drift
+SYNC_MAX_SPEED_ADJUST = 0.05  # playback speed stays within 1 +/- this
+
 # Choose an available player command
 PLAYER_CMD = None
 if shutil.which("cvlc"):
@@ -42,48 +101,616 @@ elif shutil.which("omxplayer"):
 else:
     print("Warning: no supported player found (cvlc/mpv/omxplayer). Install one and re-run.")
 
-player_proc = None
 current_url = None
+last_ts = None
 
+# One keep-alive session for all requests to the server
+session = requests.Session()
 
-def start_play(url, volume=None):
-    global player_proc, current_url
-    stop_play()
-    current_url = url
-    if not PLAYER_CMD:
-        print("No player available to start playback")
-        return
-    print(f"Starting playback: {url}")
-    if PLAYER_CMD == "cvlc":
-        cmd = ["cvlc", "--no-audio"] if volume == 0 else ["cvlc"]
-        cmd += ["--fullscreen", "--play-and-exit", url]
-    elif PLAYER_CMD == "mpv":
-        cmd = ["mpv", "--fullscreen", "--no-terminal", url]
-    elif PLAYER_CMD == "omxplayer":
-        cmd = ["omxplayer", "-o", "local", url]
-    else:
-        cmd = [PLAYER_CMD, url]
 
+class DeliveryUnsupported(Exception):
+    """The server does not support the requested delivery mode."""
+
+
+class MediaCache:
+    """Disk cache of video files with LRU eviction and resumable downloads.
+
+    index.json maps sha1(url) -> {url, file, size, etag, last_used, checked}. Partial
+    downloads live next to the final file as <file>.part and remember the ETag
+    they were started with so a resume can use If-Range. Cached files are
+    revalidated with If-None-Match at most every CACHE_REVALIDATE_INTERVAL; a
+    changed asset is downloaded in the background and used from the next play.
+    """
+
+    CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, "index.json")
+        self.lock = threading.Lock()
+        self.downloading = set()
+        # Separate session so downloads never hold up command delivery
+        self.http = requests.Session()
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
+
+    def lookup(self, url):
+        """Return the local path for a fully cached URL, or None."""
+        key = self.key(url)
+        with self.lock:
+            entry = self.index.get(key)
+            if not entry or not entry.get("size"):
+                return None
+            path = os.path.join(self.directory, entry["file"])
+            if not os.path.exists(path):
+                del self.index[key]
+                self._save_index()
+                return None
+            entry["last_used"] = time.time()
+            self._save_index()
+            stale = time.time() - entry.get("checked", 0) > CACHE_REVALIDATE_INTERVAL
+        if stale:
+            self.fetch_async(url)
+        return path
+
+    def fetch_async(self, url):
+        """Download url into the cache in the background (no-op if already running)."""
+        key = self.key(url)
+        with self.lock:
+            if key in self.downloading:
+                return
+            self.downloading.add(key)
+        threading.Thread(target=self._download, args=(url, key), daemon=True).start()
+
+    def _download(self, url, key):
+        try:
+            filename = key + os.path.splitext(url.split("?")[0])[1]
+            path = os.path.join(self.directory, filename)
+            part = path + ".part"
+            with self.lock:
+                entry = dict(self.index.get(key, {}))
+            partial_etag = entry.get("partial_etag")
+
+            headers = {}
+            if os.path.exists(part) and partial_etag:
+                headers["Range"] = f"bytes={os.path.getsize(part)}-"
+                headers["If-Range"] = partial_etag
+            elif entry.get("size") and entry.get("etag") and os.path.exists(path):
+                headers["If-None-Match"] = entry["etag"]
+
+            with self.http.get(url, headers=headers, stream=True, timeout=(5, 30)) as r:
+                if r.status_code == 304:
+                    with self.lock:
+                        if key in self.index:
+                            self.index[key]["checked"] = time.time()
+                            self._save_index()
+                    return
+                r.raise_for_status()
+                etag = r.headers.get("ETag")
+                # 206 continues the partial file; 200 means the server sent it all again
+                mode = "ab" if r.status_code == 206 else "wb"
+                with self.lock:
+                    # A complete older copy stays playable until the new one is in place
+                    current = self.index.get(key, {})
+                    self.index[key] = {"url": url, "file": filename, "size": current.get("size", 0),
+                                       "etag": current.get("etag"), "partial_etag": etag,
+                                       "last_used": time.time(), "checked": current.get("checked", 0)}
+                    self._save_index()
+                if mode == "ab":
+                    print(f"Resuming download at {os.path.getsize(part)} bytes: {url}")
+                with open(part, mode) as f:
+                    for chunk in r.iter_content(self.CHUNK_SIZE):
+                        f.write(chunk)
+
+            os.replace(part, path)
+            with self.lock:
+                self.index[key] = {"url": url, "file": filename, "size": os.path.getsize(path),
+                                   "etag": etag, "last_used": time.time(), "checked": time.time()}
+                self._evict(keep=key)
+                self._save_index()
+            print(f"Cached {url} ({os.path.getsize(path)} bytes)")
+        except Exception as e:
+            print(f"Cache download failed for {url}: {e}")
+        finally:
+            with self.lock:
+                self.downloading.discard(key)
+
+    def _evict(self, keep):
+        """Remove least recently used files until the cache fits. Call with lock held."""
+        total = sum(e.get("size", 0) for e in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda kv: kv[1].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep or key in self.downloading or not entry.get("size"):
+                continue
+            try:
+                os.remove(os.path.join(self.directory, entry["file"]))
+            except OSError:
+                pass
+            total -= entry["size"]
+            del self.index[key]
+            print(f"Evicted from cache: {entry['url']}")
+
+
+media_cache = None
+
+
+def open_media_cache(terrarium_id):
+    """Create the cache for this client's terrarium id (None if disabled or unavailable)."""
+    if not CACHE_DIR:
+        return None
     try:
-        player_proc = subprocess.Popen(cmd)
-    except Exception as e:
-        print("Failed to start player:", e)
-        player_proc = None
+        return MediaCache(CACHE_DIR.format(id=terrarium_id), CACHE_MAX_BYTES)
+    except OSError as e:
+        print("Media cache disabled:", e)
+        return None
 
 
-def stop_play():
-    global player_proc, current_url
-    if player_proc:
+def resolve_source(url):
+    """Return a local cached file for url if present, otherwise url (and start caching it)."""
+    if url.startswith(SERVER_MEDIA_PREFIX):
+        url = urljoin(SERVER_URL + "/", url)
+    if not media_cache or not url.startswith(("http://", "https://")):
+        return url
+    path = media_cache.lookup(url)
+    if path:
+        print(f"Playing from cache: {path}")
+        return path
+    media_cache.fetch_async(url)
+    return url
+
+
+class MpvPlayer:
+    """Persistent mpv process controlled through its JSON IPC socket."""
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.proc = None
+        self.request_id = 0
+        self.id_lock = threading.Lock()  # sync and delivery threads both send commands
+        self.start_lock = threading.Lock()  # only one thread may (re)start mpv
+
+    def _ensure_running(self):
+        with self.start_lock:
+            if self.proc and self.proc.poll() is None:
+                return
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+            print("Starting mpv (idle)")
+            self.proc = subprocess.Popen([
+                "mpv", "--idle=yes", "--force-window=yes", "--fullscreen", "--no-terminal",
+                "--keep-open=no", f"--input-ipc-server={self.socket_path}",
+            ])
+            deadline = time.time() + 5
+            while not os.path.exists(self.socket_path) and time.time() < deadline:
+                time.sleep(0.05)
+
+    def command(self, *args):
+        """Send one IPC command and return mpv's reply (or None on failure)."""
+        self._ensure_running()
+        with self.id_lock:
+            self.request_id += 1
+            request_id = self.request_id
+        message = json.dumps({"command": list(args), "request_id": request_id}) + "\n"
         try:
-            print("Stopping playback")
-            player_proc.terminate()
-            player_proc.wait(timeout=2)
-        except Exception:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(1.0)
+                sock.connect(self.socket_path)
+                sock.sendall(message.encode("utf-8"))
+                buf = b""
+                while True:
+                    data = sock.recv(4096)
+                    if not data:
+                        return None
+                    buf += data
+                    *lines, buf = buf.split(b"\n")
+                    for line in lines:
+                        reply = json.loads(line)
+                        # Skip asynchronous events mpv interleaves with replies
+                        if reply.get("request_id") == request_id:
+                            if reply.get("error") != "success":
+                                print(f"mpv {args[0]} failed: {reply.get('error')}")
+                            return reply
+        except (OSError, ValueError) as e:
+            print(f"mpv IPC error ({args[0]}):", e)
+            return None
+
+    def load(self, source, volume=None, start=0.0, paused=False):
+        # "start" and "pause" are applied to the next loadfile, so set them first
+        self.command("set_property", "pause", paused)
+        self.command("set_property", "start", str(start))
+        self.command("set_property", "speed", 1.0)
+        self.command("set_property", "loop-file", "no")
+        self.command("loadfile", source, "replace")
+        if volume is not None:
+            self.set_volume(volume)
+
+    def get(self, name):
+        reply = self.command("get_property", name)
+        if reply and reply.get("error") == "success":
+            return reply.get("data")
+        return None
+
+    def set_speed(self, speed):
+        self.command("set_property", "speed", speed)
+
+    def pause(self):
+        self.command("set_property", "pause", True)
+
+    def resume(self):
+        self.command("set_property", "pause", False)
+
+    def seek(self, seconds):
+        self.command("seek", seconds, "absolute")
+
+    def set_volume(self, volume):
+        self.command("set_property", "volume", volume)
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.command("stop")
+
+    def close(self):
+        if self.proc and self.proc.poll() is None:
+            self.command("quit")
             try:
-                player_proc.kill()
-            except Exception:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.proc = None
+
+
+class VlcPlayer:
+    """Persistent VLC process controlled through its RC (remote control) interface."""
+
+    def __init__(self, port=VLC_RC_PORT):
+        self.port = port
+        self.proc = None
+        self.sock = None
+        self.paused = False
+        self.lock = threading.Lock()  # sync and delivery threads share the process and RC socket
+
+    def _ensure_running(self):
+        if self.proc and self.proc.poll() is None and self.sock:
+            return
+        if not self.proc or self.proc.poll() is not None:
+            print("Starting VLC (idle)")
+            self.proc = subprocess.Popen([
+                "cvlc", "--fullscreen", "--extraintf", "rc",
+                "--rc-host", f"127.0.0.1:{self.port}",
+            ])
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            try:
+                self.sock = socket.create_connection(("127.0.0.1", self.port), timeout=1.0)
+                return
+            except OSError:
+                time.sleep(0.05)
+
+    def _drain(self):
+        # RC echoes prompts and status lines; discard them so the buffer never fills
+        self.sock.settimeout(0.02)
+        try:
+            while self.sock.recv(4096):
                 pass
-        player_proc = None
+        except OSError:
+            pass
+        self.sock.settimeout(1.0)
+
+    def command(self, line):
+        with self.lock:
+            self._ensure_running()
+            if not self.sock:
+                print(f"VLC RC not reachable ({line})")
+                return
+            try:
+                self.sock.sendall((line + "\n").encode("utf-8"))
+                self._drain()
+            except OSError as e:
+                print(f"VLC RC error ({line}):", e)
+                self.sock = None
+
+    def load(self, source, volume=None, start=0.0, paused=False):
+        self.command("clear")
+        self.command(f"add {source}")
+        self.paused = False
+        if start:
+            self.seek(start)
+        if paused:
+            self.pause()
+        if volume is not None:
+            self.set_volume(volume)
+
+    def pause(self):
+        # RC "pause" toggles, so track the state to make pause/resume idempotent
+        if not self.paused:
+            self.command("pause")
+            self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self.command("pause")
+            self.paused = False
+
+    def seek(self, seconds):
+        self.command(f"seek {int(seconds)}")
+
+    def set_volume(self, volume):
+        # RC volume is 0-512 with 256 = 100%
+        self.command(f"volume {int(float(volume) * 256 / 100)}")
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.command("stop")
+        self.paused = False
+
+    def close(self):
+        if self.proc and self.proc.poll() is None:
+            self.command("quit")
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.proc = None
+        self.sock = None
+
+
+class ProcessPlayer:
+    """Fallback for players without IPC: one process per clip, signal-based pause."""
+
+    def __init__(self, player_cmd):
+        self.player_cmd = player_cmd
+        self.proc = None
+
+    def load(self, source, volume=None, start=0.0, paused=False):
+        self.stop()
+        if self.player_cmd == "omxplayer":
+            cmd = ["omxplayer", "-o", "local", source]
+            if start:
+                cmd[1:1] = ["--pos", str(int(start))]
+        else:
+            cmd = [self.player_cmd, source]
+        try:
+            self.proc = subprocess.Popen(cmd)
+        except Exception as e:
+            print("Failed to start player:", e)
+            self.proc = None
+
+    def _signal(self, sig, label):
+        if self.proc and self.proc.poll() is None:
+            try:
+                print(f"{label} playback ({sig.name})")
+                self.proc.send_signal(sig)
+            except Exception as e:
+                print(f"{label} not supported:", e)
+        else:
+            print(f"No active player to {label.lower()}")
+
+    def pause(self):
+        self._signal(signal.SIGSTOP, "Pause")
+
+    def resume(self):
+        self._signal(signal.SIGCONT, "Resume")
+
+    def seek(self, seconds):
+        print("Seek not supported by", self.player_cmd)
+
+    def set_volume(self, volume):
+        print("Volume change not supported by", self.player_cmd)
+
+    def stop(self):
+        if self.proc:
+            try:
+                self.proc.terminate()
+                self.proc.wait(timeout=2)
+            except Exception:
+                try:
+                    self.proc.kill()
+                except Exception:
+                    pass
+            self.proc = None
+
+    def close(self):
+        self.stop()
+
+
+def make_player(vlc_port=VLC_RC_PORT):
+    if PLAYER_CMD == "mpv":
+        return MpvPlayer(MPV_IPC_SOCKET.format(id=TERRARIUM_ID))
+    if PLAYER_CMD == "cvlc":
+        return VlcPlayer(vlc_port)
+    if PLAYER_CMD:
+        return ProcessPlayer(PLAYER_CMD)
+    return None
+
+
+player = None
+
+
+class SyncClock:
+    """Estimates the offset between the local clock and the server clock.
+
+    Each exchange is a GET /time over a keep-alive session; the server time is
+    assumed to be read halfway through the round trip, and the sample with the
+    smallest round trip is kept (NTP-style minimum filter).
+    """
+
+    def __init__(self):
+        self.http = requests.Session()
+        self.offset = 0.0
+        self.rtt = None
+        self.updated = 0.0
+        self.next_refresh = 0.0  # time.time() of the next estimate
+        self.retry_delay = SYNC_CLOCK_RETRY_MIN
+        self.lock = threading.Lock()
+
+    def _exchange(self):
+        t0 = time.time()
+        r = self.http.get(f"{SERVER_URL}/time", timeout=2)
+        t1 = time.time()
+        r.raise_for_status()
+        server = r.json()["now"] / 1000.0
+        return server - (t0 + t1) / 2, t1 - t0
+
+    def refresh(self):
+        samples = []
+        for _ in range(SYNC_CLOCK_SAMPLES + 1):
+            try:
+                samples.append(self._exchange())
+            except Exception as e:
+                print("Clock sync exchange failed:", e)
+                break  # server unreachable; don't wait out every timeout
+        if len(samples) > 1:
+            samples = samples[1:]  # the first exchange pays for connection setup
+        if not samples:
+            # Keep the last offset (0 if none yet) and retry later with backoff
+            with self.lock:
+                self.next_refresh = time.time() + self.retry_delay
+                self.retry_delay = min(self.retry_delay * 2, SYNC_CLOCK_REFRESH)
+            return False
+        offset, rtt = min(samples, key=lambda sample: sample[1])
+        with self.lock:
+            self.offset, self.rtt, self.updated = offset, rtt, time.time()
+            self.next_refresh = self.updated + SYNC_CLOCK_REFRESH
+            self.retry_delay = SYNC_CLOCK_RETRY_MIN
+        print(f"Clock offset to server: {offset * 1000:+.1f} ms (rtt {rtt * 1000:.1f} ms)")
+        return True
+
+    def now(self):
+        """Current server time in seconds."""
+        if time.time() >= self.next_refresh:
+            self.refresh()
+        with self.lock:
+            return time.time() + self.offset
+
+
+class SyncController:
+    """Starts a clip at a shared server time and holds it on the shared timeline."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+
+    def schedule(self, source, start_at, offset=0.0, volume=None, loop=False):
+        """Play source so that clip position `offset` is shown at server time start_at (s)."""
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+        threading.Thread(
+            target=self._run,
+            args=(generation, source, start_at, offset, volume, loop),
+            daemon=True,
+        ).start()
+
+    def _active(self, generation):
+        with self.lock:
+            return generation == self.generation
+
+    def _expected_position(self, start_at, offset, duration, loop):
+        position = offset + (self.clock.now() - start_at)
+        if loop and duration:
+            position %= duration
+        return position
+
+    def _run(self, generation, source, start_at, offset, volume, loop):
+        self.clock.now()  # make sure the offset estimate is fresh before waiting
+        can_track = isinstance(player, MpvPlayer)
+        lead = self.clock.now() - start_at
+        if lead > 0:
+            # Command arrived late: join the timeline where it is now
+            print(f"Sync start is {lead:.2f}s in the past, joining late")
+        if can_track:
+            player.load(source, volume, start=max(0.0, offset + max(0.0, lead)), paused=True)
+            if loop:
+                player.command("set_property", "loop-file", "inf")
+
+        # Sleep coarsely, then in short steps for the last few milliseconds
+        while self._active(generation):
+            remaining = start_at - self.clock.now()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.5) if remaining > 0.05 else remaining)
+        if not self._active(generation):
+            return
+
+        if not can_track:
+            player.load(source, volume, start=offset + max(0.0, self.clock.now() - start_at))
+            return
+        player.resume()
+        print(f"Synchronized playback started (server time {start_at:.3f})")
+
+        duration = None
+        while self._active(generation):
+            time.sleep(SYNC_CHECK_INTERVAL)
+            if not self._active(generation):
+                break
+            position = player.get("time-pos")
+            if position is None:
+                if player.get("idle-active"):
+                    break  # clip ended
+                continue
+            if duration is None:
+                duration = player.get("duration")
+            expected = self._expected_position(start_at, offset, duration, loop)
+            error = position - expected
+            if loop and duration:
+                # Compare across the loop point the short way round
+                error = (error + duration / 2) % duration - duration / 2
+            if abs(error) > SYNC_SEEK_THRESHOLD:
+                print(f"Sync drift {error:+.3f}s, seeking")
+                player.seek(expected)
+                player.set_speed(1.0)
+            else:
+                adjust = max(-SYNC_MAX_SPEED_ADJUST, min(SYNC_MAX_SPEED_ADJUST, error * SYNC_GAIN))
+                player.set_speed(1.0 - adjust)
+
+
+sync = SyncController(SyncClock())
+
+
+def start_play(url, volume=None, start_at=None, offset=0.0, loop=False):
+    global current_url
+    sync.cancel()
+    current_url = url
+    if not player:
+        print("No player available to start playback")
+        return
+    if start_at is not None:
+        print(f"Scheduling synchronized playback: {url} at {start_at:.3f}")
+        sync.schedule(resolve_source(url), start_at, offset, volume, loop)
+        return
+    print(f"Starting playback: {url}")
+    player.load(resolve_source(url), volume)
+
+
+def stop_play():
+    global current_url
+    sync.cancel()
+    if player:
+        print("Stopping playback")
+        player.stop()
     current_url = None
 
 
@@ -92,66 +719,154 @@ def handle_command(cmd):
     action = cmd.get("action")
     url = cmd.get("url")
     volume = cmd.get("volume")
+    start_at = cmd.get("startAt") / 1000.0 if cmd.get("startAt") else None
+    offset = float(cmd.get("offset") or 0)
+    loop = bool(cmd.get("loop"))
     print("Received LCD command:", cmd)
 
     if action == "play":
         if not url and not current_url:
             print("No URL provided for play command")
             return
-        start_play(url or current_url, volume)
+        start_play(url or current_url, volume, start_at, offset, loop)
     elif action == "stop":
         stop_play()
+    elif not player:
+        print("No player available for", action)
     elif action == "pause":
-        # Simple approach: send SIGSTOP/SIGCONT to process as pause/resume fallback
-        if player_proc and player_proc.poll() is None:
-            try:
-                print("Pausing playback (SIGSTOP)")
-                player_proc.send_signal(subprocess.signal.SIGSTOP)
-            except Exception as e:
-                print("Pause not supported:", e)
-        else:
-            print("No active player to pause")
+        sync.cancel()
+        player.pause()
     elif action == "resume":
-        if player_proc and player_proc.poll() is None:
-            try:
-                print("Resuming playback (SIGCONT)")
-                player_proc.send_signal(subprocess.signal.SIGCONT)
-            except Exception as e:
-                print("Resume not supported:", e)
-        else:
-            print("No active player to resume")
+        player.resume()
     elif action == "set_url":
         if url:
-            # start playing the new url immediately
-            start_play(url, volume)
+            # start playing the new url immediately (or at startAt in sync mode)
+            start_play(url, volume, start_at, offset, loop)
     elif action == "set_volume":
-        print("Volume change requested (not implemented in demo):", volume)
+        if volume is not None:
+            player.set_volume(volume)
+    elif action == "seek":
+        if cmd.get("position") is not None:
+            sync.cancel()
+            player.seek(float(cmd["position"]))
     else:
         print("Unknown LCD action:", action)
 
 
+def dispatch(cmd):
+    """Run a command once, skipping repeats of the last seen timestamp."""
+    global last_ts
+    if cmd and cmd.get("timestamp") != last_ts:
+        last_ts = cmd.get("timestamp")
+        handle_command(cmd)
+
+
+def sse_loop():
+    """Consume the server's SSE stream until the connection drops."""
+    r = session.get(
+        f"{SERVER_URL}/lcd/{TERRARIUM_ID}/events",
+        headers={"Accept": "text/event-stream"},
+        stream=True,
+        timeout=(5, SSE_READ_TIMEOUT),
+    )
+    with r:
+        if r.status_code == 404:
+            raise DeliveryUnsupported("no /events endpoint")
+        r.raise_for_status()
+        print("Subscribed to LCD events (SSE)")
+        r.encoding = "utf-8"
+        data_lines = []
+        # chunk_size=1 so each event is handled as soon as its bytes arrive
+        for line in r.iter_lines(chunk_size=1, decode_unicode=True):
+            if line is None:
+                continue
+            if line == "":
+                if data_lines:
+                    dispatch(json.loads("\n".join(data_lines)))
+                    data_lines = []
+            elif line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+            # "event:", "id:" and ": ping" comment lines need no handling
+    raise ConnectionError("SSE stream closed")
+
+
+def long_poll_loop():
+    """Hold a request open on the server until a new command arrives."""
+    print("Using long-poll delivery")
+    while True:
+        params = {"wait": LONG_POLL_WAIT}
+        if last_ts is not None:
+            params["since"] = last_ts
+        r = session.get(
+            f"{SERVER_URL}/lcd/{TERRARIUM_ID}/last",
+            params=params,
+            timeout=(5, LONG_POLL_WAIT + 10),
+        )
+        if not r.headers.get("X-Long-Poll"):
+            raise DeliveryUnsupported("server ignores wait parameter")
+        if r.status_code == 200:
+            dispatch(r.json().get("command"))
+        elif r.status_code != 404:  # 404 means no command yet
+            r.raise_for_status()
+
+
 def poll_loop():
-    last_ts = None
+    """Fallback: ask for the last command every POLL_INTERVAL seconds."""
+    print("Using polling delivery")
     while True:
+        r = session.get(f"{SERVER_URL}/lcd/{TERRARIUM_ID}/last", timeout=3)
+        if r.status_code == 200:
+            dispatch(r.json().get("command"))
+        # else: 404 means no command
+        time.sleep(POLL_INTERVAL)
+
+
+DELIVERY_LOOPS = {"sse": sse_loop, "longpoll": long_poll_loop, "poll": poll_loop}
+DELIVERY_ORDER = ["sse", "longpoll", "poll"]
+
+
+def run_client():
+    """Run the preferred delivery mode, reconnecting and falling back as needed."""
+    mode_index = DELIVERY_ORDER.index(DELIVERY_MODE)
+    backoff = RECONNECT_MIN
+    while True:
+        mode = DELIVERY_ORDER[mode_index]
+        started = time.time()
         try:
-            r = requests.get(f"{SERVER_URL}/lcd/{TERRARIUM_ID}/last", timeout=3)
-            if r.status_code == 200:
-                payload = r.json()
-                cmd = payload.get("command")
-                if cmd and cmd.get("timestamp") != last_ts:
-                    handle_command(cmd)
-                    last_ts = cmd.get("timestamp")
-            # else: 404 means no command
+            DELIVERY_LOOPS[mode]()
+        except DeliveryUnsupported as e:
+            print(f"Delivery mode '{mode}' unsupported ({e}), falling back")
+            mode_index = min(mode_index + 1, len(DELIVERY_ORDER) - 1)
+            continue
         except Exception as e:
-            print("Poll error:", e)
-        time.sleep(POLL_INTERVAL)
+            print(f"Connection error ({mode}):", e)
+        # A connection that stayed up for a while resets the backoff
+        if time.time() - started > RECONNECT_MAX:
+            backoff = RECONNECT_MIN
+        print(f"Reconnecting in {backoff:.0f}s")
+        time.sleep(backoff)
+        backoff = min(backoff * 2, RECONNECT_MAX)
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Terrarium LCD video client")
+    parser.add_argument("--server", default=SERVER_URL, help="server base URL")
+    parser.add_argument("--id", default=TERRARIUM_ID, help="terrarium id to receive commands for")
+    parser.add_argument("--vlc-port", type=int, default=VLC_RC_PORT, help="VLC RC port (unique per instance)")
+    args = parser.parse_args()
+    SERVER_URL = args.server.rstrip("/")
+    TERRARIUM_ID = str(args.id)
+    media_cache = open_media_cache(TERRARIUM_ID)
+    player = make_player(args.vlc_port)
+
     print("Pi LCD client starting. Player command:", PLAYER_CMD)
     try:
-        poll_loop()
+        run_client()
     except KeyboardInterrupt:
         print("Exiting, stopping player")
         stop_play()
+        if player:
+            player.close()
         sys.exit(0)
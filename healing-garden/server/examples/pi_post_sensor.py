@@ -8,13 +8,29 @@ Hardware support (install as needed):
 
 Edit SERVER_URL and DEVICE_ID as needed.
 Run: python pi_post_sensor.py
+     python pi_post_sensor.py --fake-i2c   # simulated BH1750, no hardware needed
 
-For continuous monitoring, run in a loop or use cron/systemd timer.
+For continuous monitoring, run with --continuous or use cron/systemd timer.
+In continuous mode snapshots are batched and sent as a gzip-compressed JSON array
+over one keep-alive connection (see BATCH_MAX_COUNT / BATCH_MAX_AGE). Snapshots
+that stay within DEADBANDS of the last upload are skipped until HEARTBEAT_INTERVAL.
+Snapshots are queued in QUEUE_FILE first, so readings taken while the server is
+down are delivered later with their original timestamps.
+
+Each sensor is sampled on its own thread at the rate it supports and publishes into
+a shared latest-value cache, so building a snapshot never waits on a slow sensor
+(DHT22 retries can take several seconds). Values older than STALE_FACTOR sample
+intervals are reported in the snapshot's "stale" list.
 """
 
+import os
 import time
+import gzip
 import json
+import random
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 import sys
 
 # Configure these
@@ -24,14 +40,40 @@ DEVICE_NAME = "로오즈마아리"
 PLANT_TYPE = "허브류"
 POLL_INTERVAL = 5  # seconds between sensor readings
 
+# Upload batching (continuous mode): snapshots are queued on disk and sent as one
+# gzip-compressed JSON array when either limit is reached
+BATCH_MAX_COUNT = 12  # snapshots per upload
+BATCH_MAX_AGE = 60  # seconds the oldest queued snapshot may wait
+
+# Offline queue: survives restarts and server outages, oldest snapshots dropped when full
+QUEUE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sensor_queue.jsonl")
+QUEUE_MAX_BYTES = 512 * 1024
+CATCHUP_INTERVAL = 2.0  # seconds between batches while draining a backlog
+RETRY_MAX_DELAY = 60  # backoff cap (seconds) while the server is unreachable
+
+# Edge filtering (continuous mode): a snapshot is only uploaded when a metric moved
+# by more than its deadband since the last upload, or HEARTBEAT_INTERVAL has passed
+DEADBANDS = {"temp": 0.3, "hum": 2.0, "lux": 15}
+HEARTBEAT_INTERVAL = 300  # seconds; max gap between uploads (~96% suppressed when stable at 5 s polls)
+
 # Sensor configuration
 USE_DHT22 = True  # set to False if no DHT22 connected
 DHT_PIN = 4  # GPIO pin for DHT22 data line
 USE_BH1750 = True  # set to False if no BH1750 connected
+BH1750_ADDR = 0x23  # 0x5C if the ADDR pin is pulled high
+BH1750_MODE = "high"  # "high" (1 lx), "high2" (0.5 lx) or "low" (4 lx, faster)
+BH1750_MTREG = 69  # measurement time register 31-254 (69 = datasheet default)
+FAKE_I2C = '--fake-i2c' in sys.argv  # simulated I2C bus for testing without hardware
+
+# Per-sensor sampling intervals (seconds)
+DHT_SAMPLE_INTERVAL = 2.5  # DHT22 cannot be read more often than every ~2 s
+BH1750_SAMPLE_INTERVAL = 1.0
+STALE_FACTOR = 3  # a value older than this many sample intervals is flagged stale
 
 # Try to import sensor libraries
 DHT_sensor = None
 BH1750_sensor = None
+i2c_bus = None  # SensorBus reading every I2C device in one transaction
 
 if USE_DHT22:
     try:
@@ -43,14 +85,26 @@ if USE_DHT22:
         USE_DHT22 = False
 
 if USE_BH1750:
-    try:
-        import smbus2
-        BH1750_sensor = smbus2.SMBus(1)  # I2C bus 1
-        BH1750_ADDR = 0x23
-        print("✓ BH1750 light sensor library loaded")
-    except ImportError:
+    from i2c_sensors import BH1750, SensorBus, SMBus, fake_bh1750_bus
+    if FAKE_I2C:
+        bus = fake_bh1750_bus(BH1750_ADDR)
+        print("✓ BH1750 using simulated I2C bus")
+    elif SMBus is None:
+        bus = None
         print("⚠ smbus2 not installed. Install with: pip install smbus2")
         USE_BH1750 = False
+    else:
+        bus = SMBus(1)  # I2C bus 1
+        print("✓ BH1750 light sensor library loaded")
+    if bus is not None:
+        try:
+            # Configured once: power on, MTreg and continuous mode. Reads afterwards
+            # never rewrite the mode or wait out a fresh conversion.
+            i2c_bus = SensorBus(bus)
+            BH1750_sensor = i2c_bus.add(BH1750(bus, BH1750_ADDR, BH1750_MODE, BH1750_MTREG))
+        except OSError as e:
+            print(f"⚠ BH1750 not responding at {hex(BH1750_ADDR)}: {e}")
+            USE_BH1750 = False
 
 def read_dht22():
     """Read temperature and humidity from DHT22 sensor."""
@@ -71,20 +125,91 @@ def read_bh1750():
         return None
     
     try:
-        # BH1750 continuous high-res mode
-        BH1750_sensor.write_byte(BH1750_ADDR, 0x10)
-        time.sleep(0.2)
-        data = BH1750_sensor.read_i2c_block_data(BH1750_ADDR, 0x00, 2)
-        lux = (data[0] << 8 | data[1]) / 1.2
-        return round(lux, 0)
+        return round(BH1750_sensor.read(), 0)
     except Exception as e:
         print(f"BH1750 read error: {e}")
     return None
 
-def get_sensor_snapshot():
-    """Get current sensor readings from hardware or generate mock data."""
-    temp, hum = read_dht22()
-    lux = read_bh1750()
+class LatestValueCache:
+    """Thread-safe store of the latest reading per metric with its timestamp."""
+
+    def __init__(self):
+        self._values = {}  # name -> (value, timestamp, max_age)
+        self._cond = threading.Condition()
+
+    def publish(self, name, value, max_age):
+        with self._cond:
+            self._values[name] = (value, time.time(), max_age)
+            self._cond.notify_all()
+
+    def get(self, name):
+        """Return (value, age_seconds, stale). Missing values are (None, None, True)."""
+        with self._cond:
+            entry = self._values.get(name)
+        if entry is None:
+            return None, None, True
+        value, timestamp, max_age = entry
+        age = time.time() - timestamp
+        return value, age, age > max_age
+
+    def wait_for(self, names, timeout):
+        """Block until every name has a value or timeout expires."""
+        with self._cond:
+            return self._cond.wait_for(lambda: all(n in self._values for n in names), timeout)
+
+
+class SensorSampler(threading.Thread):
+    """Calls read_fn every interval seconds and publishes its non-None results."""
+
+    def __init__(self, name, read_fn, interval, cache):
+        super().__init__(name=f"sampler-{name}", daemon=True)
+        self.read_fn = read_fn
+        self.interval = interval
+        self.cache = cache
+
+    def run(self):
+        while True:
+            started = time.time()
+            try:
+                for metric, value in self.read_fn().items():
+                    if value is not None:
+                        self.cache.publish(metric, value, self.interval * STALE_FACTOR)
+            except Exception as e:
+                print(f"{self.name} error: {e}")
+            time.sleep(max(0.0, self.interval - (time.time() - started)))
+
+
+def start_samplers(cache):
+    """Start one sampling thread per enabled sensor. Returns the metric names they provide."""
+    metrics = []
+    if USE_DHT22 and DHT_sensor:
+        def sample_dht():
+            temp, hum = read_dht22()
+            return {"temp": temp, "hum": hum}
+        SensorSampler("dht22", sample_dht, DHT_SAMPLE_INTERVAL, cache).start()
+        metrics += ["temp", "hum"]
+    if i2c_bus and i2c_bus.devices:
+        # One thread and one bus transaction for every I2C device
+        def sample_i2c():
+            return {name: round(value, 0) for name, value in i2c_bus.read_all().items()}
+        SensorSampler("i2c", sample_i2c, BH1750_SAMPLE_INTERVAL, cache).start()
+        metrics += [device.name for device in i2c_bus.devices]
+    return metrics
+
+
+sensor_cache = LatestValueCache()
+
+
+def get_sensor_snapshot(cache=sensor_cache):
+    """Assemble a snapshot from the latest cached readings (falls back to mock data)."""
+    temp, _, temp_stale = cache.get("temp")
+    hum, _, hum_stale = cache.get("hum")
+    lux, _, lux_stale = cache.get("lux")
+    stale = [name for name, value, is_stale in
+             (("temp", temp, temp_stale), ("hum", hum, hum_stale), ("lux", lux, lux_stale))
+             if value is not None and is_stale]
+    if stale:
+        print(f"⚠ Stale readings: {', '.join(stale)}")
     
     # Fallback to mock data if sensors not available
     if temp is None:
@@ -104,15 +229,67 @@ def get_sensor_snapshot():
         "temp": round(temp, 1),
         "hum": round(hum, 1),
         "lux": int(lux),
+        "stale": stale,
         "timestamp": int(time.time() * 1000),
     }
 
 
+class EdgeFilter:
+    """Suppresses snapshots whose metrics stayed within their deadbands.
+
+    Changes are measured against the last *sent* snapshot, so slow drift still
+    triggers an upload once it adds up to a deadband.
+    """
+
+    def __init__(self, deadbands=DEADBANDS, heartbeat=HEARTBEAT_INTERVAL):
+        self.deadbands = deadbands
+        self.heartbeat = heartbeat
+        self.last_sent = None
+        self.last_sent_at = None
+        self.seen = 0
+        self.suppressed = 0
+
+    def changed(self, snapshot):
+        """Return the metrics that moved beyond their deadband (or all, if nothing was sent yet)."""
+        if self.last_sent is None:
+            return list(self.deadbands)
+        moved = [name for name, band in self.deadbands.items()
+                 if abs(snapshot[name] - self.last_sent[name]) > band]
+        if snapshot.get("stale") != self.last_sent.get("stale"):
+            moved.append("stale")
+        return moved
+
+    def should_send(self, snapshot):
+        self.seen += 1
+        now = time.monotonic()
+        heartbeat_due = self.last_sent_at is None or now - self.last_sent_at >= self.heartbeat
+        if self.changed(snapshot) or heartbeat_due:
+            self.last_sent = snapshot
+            self.last_sent_at = now
+            return True
+        self.suppressed += 1
+        return False
+
+    @property
+    def suppression_ratio(self):
+        return self.suppressed / self.seen if self.seen else 0.0
+
+    def report(self):
+        print(f"Edge filter: {self.suppressed}/{self.seen} snapshots suppressed "
+              f"({self.suppression_ratio:.0%})")
+
+
+# One keep-alive connection reused for every upload
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+
 def post_snapshot(snapshot):
     """Send sensor snapshot to server."""
     url = f"{SERVER_URL}/sensors/update"
     try:
-        r = requests.post(url, json=snapshot, timeout=5)
+        r = session.post(url, json=snapshot, timeout=5)
         r.raise_for_status()
         print(f"✓ Posted: {snapshot['temp']}°C, {snapshot['hum']}%, {snapshot['lux']}lx")
         return True
@@ -123,6 +300,184 @@ def post_snapshot(snapshot):
     return False
 
 
+def post_batch(snapshots):
+    """Send a list of snapshots as one gzip-compressed JSON array."""
+    url = f"{SERVER_URL}/sensors/update"
+    body = gzip.compress(json.dumps(snapshots, separators=(",", ":")).encode("utf-8"))
+    headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    try:
+        r = session.post(url, data=body, headers=headers, timeout=10)
+        r.raise_for_status()
+        last = snapshots[-1]
+        print(f"✓ Posted {len(snapshots)} snapshots ({len(body)} bytes): "
+              f"{last['temp']}°C, {last['hum']}%, {last['lux']}lx")
+        return True
+    except requests.exceptions.ConnectionError:
+        print("✗ Connection failed: Is the server running?")
+    except Exception as e:
+        print(f"✗ Failed to post batch: {e}")
+    return False
+
+
+class DiskQueue:
+    """Append-only JSONL queue on disk, capped at max_bytes.
+
+    put() appends and fsyncs one line, so a crash loses at most the line being
+    written (a torn last line is skipped on load). ack() and eviction rewrite the
+    file to a temp file and atomically replace it.
+    """
+
+    def __init__(self, path=QUEUE_FILE, max_bytes=QUEUE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.items = []  # encoded lines, oldest first
+        self.size = 0
+        self.evicted = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        continue  # torn write from a crash
+                    self.items.append(line if line.endswith(b"\n") else line + b"\n")
+        except FileNotFoundError:
+            return
+        self.size = sum(len(line) for line in self.items)
+        self._rewrite()
+        if self.items:
+            print(f"✓ Loaded {len(self.items)} queued snapshots from {self.path}")
+
+    def _rewrite(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.writelines(self.items)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+    def put(self, snapshot):
+        line = json.dumps(snapshot, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self.lock:
+            self.items.append(line)
+            self.size += len(line)
+            if self.size > self.max_bytes:
+                dropped = 0
+                while self.size > self.max_bytes and len(self.items) > 1:
+                    self.size -= len(self.items.pop(0))
+                    dropped += 1
+                self.evicted += dropped
+                self._rewrite()
+                print(f"⚠ Offline queue full, dropped {dropped} oldest snapshots")
+                return
+            with open(self.path, "ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def peek(self, count):
+        """Return the oldest count entries (encoded lines, pass back to ack())."""
+        with self.lock:
+            return self.items[:count]
+
+    def ack(self, lines):
+        """Remove delivered entries. Entries evicted meanwhile are simply skipped."""
+        delivered = {id(line) for line in lines}
+        with self.lock:
+            self.items = [line for line in self.items if id(line) not in delivered]
+            self.size = sum(len(line) for line in self.items)
+            self._rewrite()
+
+
+class BatchUploader(threading.Thread):
+    """Background sender draining the offline queue in batches.
+
+    A batch is sent once BATCH_MAX_COUNT snapshots are queued or the oldest has
+    waited BATCH_MAX_AGE. While a backlog remains, batches go out at most every
+    CATCHUP_INTERVAL so a reconnect doesn't flood the server. Failed sends back off
+    exponentially (with jitter) up to RETRY_MAX_DELAY. Snapshots keep their
+    original timestamps.
+    """
+
+    def __init__(self, queue, max_count=BATCH_MAX_COUNT, max_age=BATCH_MAX_AGE,
+                 catchup_interval=CATCHUP_INTERVAL, retry_max_delay=RETRY_MAX_DELAY):
+        super().__init__(name="uploader", daemon=True)
+        self.queue = queue
+        self.max_count = max_count
+        self.max_age = max_age
+        self.catchup_interval = catchup_interval
+        self.retry_max_delay = retry_max_delay
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.failures = 0
+
+    def add(self, snapshot):
+        self.queue.put(snapshot)
+        self.wakeup.set()
+
+    def _wait_before_send(self):
+        """Seconds until the next batch is due (None if the queue is empty)."""
+        batch = self.queue.peek(self.max_count)
+        if not batch:
+            return None
+        if len(batch) >= self.max_count:
+            return 0
+        waited = time.time() - json.loads(batch[0])["timestamp"] / 1000
+        return max(0.0, self.max_age - waited)
+
+    def send_batch(self):
+        """Send the oldest batch. Returns True if it was delivered."""
+        lines = self.queue.peek(self.max_count)
+        if not lines:
+            return True
+        if not post_batch([json.loads(line) for line in lines]):
+            return False
+        self.queue.ack(lines)
+        return True
+
+    def run(self):
+        while not self.stopping.is_set():
+            wait = self._wait_before_send()
+            if wait is None or wait > 0:
+                self.wakeup.wait(wait)
+                self.wakeup.clear()
+                continue
+            if self.send_batch():
+                self.failures = 0
+                if len(self.queue) >= self.max_count:
+                    print(f"Catching up: {len(self.queue)} snapshots queued")
+                    self.stopping.wait(self.catchup_interval)
+            else:
+                self.failures += 1
+                delay = min(self.retry_max_delay, 2 ** self.failures)
+                delay = random.uniform(delay / 2, delay)
+                print(f"Retrying in {delay:.0f}s ({len(self.queue)} snapshots queued)")
+                self.stopping.wait(delay)
+
+    def stop(self):
+        """Stop the sender and try once to deliver what's queued (the rest stays on disk)."""
+        self.stopping.set()
+        self.wakeup.set()
+        if self.is_alive():
+            self.join(timeout=15)
+        # Still inside send_batch: draining now could upload and ack the same head twice
+        if self.is_alive():
+            print("Uploader still sending; leaving the queue for next start")
+        else:
+            while len(self.queue) and self.send_batch():
+                pass
+        if len(self.queue):
+            print(f"{len(self.queue)} snapshots left in {self.queue.path} for next start")
+
+
 if __name__ == '__main__':
     print(f"Starting sensor monitor for device {DEVICE_ID} ({DEVICE_NAME})")
     print(f"Server: {SERVER_URL}")
@@ -133,13 +488,31 @@ if __name__ == '__main__':
     # Run single snapshot or continuous loop
     continuous = '--continuous' in sys.argv or '-c' in sys.argv
     
+    # Sample sensors in the background; wait once for first readings so the
+    # first snapshot isn't mock data (DHT22 retries can take ~6 s)
+    metrics = start_samplers(sensor_cache)
+    if metrics:
+        sensor_cache.wait_for(metrics, timeout=DHT_SAMPLE_INTERVAL * STALE_FACTOR)
+    
     try:
         if continuous:
             print("Running in continuous mode (Ctrl+C to stop)")
-            while True:
-                snap = get_sensor_snapshot()
-                post_snapshot(snap)
-                time.sleep(POLL_INTERVAL)
+            print(f"Uploads batched: up to {BATCH_MAX_COUNT} snapshots or {BATCH_MAX_AGE}s, gzip")
+            print(f"Deadbands: {DEADBANDS}, heartbeat every {HEARTBEAT_INTERVAL}s")
+            uploader = BatchUploader(DiskQueue())
+            uploader.start()
+            edge_filter = EdgeFilter()
+            try:
+                while True:
+                    snap = get_sensor_snapshot()
+                    if edge_filter.should_send(snap):
+                        uploader.add(snap)
+                    if edge_filter.seen % max(1, HEARTBEAT_INTERVAL // POLL_INTERVAL) == 0:
+                        edge_filter.report()
+                    time.sleep(POLL_INTERVAL)
+            finally:
+                uploader.stop()
+                edge_filter.report()
         else:
             # Single reading
             snap = get_sensor_snapshot()
@@ -14,12 +14,21 @@ pip install firebase-admin requests
 
 3. 실행:
    python upload_to_firebase.py --continuous
+   python upload_to_firebase.py --watch   # 파일 변경 시 즉시 업로드
+   python upload_to_firebase.py --tail    # NDJSON 로그(한 줄에 한 측정값)를 이어서 업로드
+   python upload_to_firebase.py --dir     # 여러 아두이노의 JSON 파일 폴더를 한 번에 업로드
 """
 
 import json
 import time
+import hashlib
 import sys
 import os
+import select
+import struct
+import ctypes
+import ctypes.util
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -44,12 +53,37 @@ DATABASE_URL = "https://YOUR_PROJECT_ID-default-rtdb.firebaseio.com"
 # 예: /home/pi/arduino_data/sensor_data.json
 ARDUINO_JSON_PATH = "/home/pi/arduino_data/sensor_data.json"
 
+# 여러 아두이노를 받는 게이트웨이용 폴더 (--dir 모드) - 장치마다 JSON 파일 하나 (*.json)
+ARDUINO_JSON_DIR = "/home/pi/arduino_data/devices"
+FLUSH_WINDOW = 1.0  # 첫 변경 후 이 시간(초) 동안 모은 변경을 update() 한 번으로 기록
+PARSE_WORKERS = 4  # JSON 파싱 스레드 수
+FLUSH_RETRY_INTERVAL = 10  # 업로드 실패 시 재시도 간격 (초)
+
+# 아두이노가 한 줄에 측정값 하나씩 덧붙이는 NDJSON 로그 (--tail 모드)
+ARDUINO_NDJSON_PATH = "/home/pi/arduino_data/sensor_data.ndjson"
+# 마지막으로 업로드한 위치 저장 파일 (재시작 시 중복/누락 방지)
+NDJSON_CHECKPOINT_PATH = ARDUINO_NDJSON_PATH + ".offset"
+TAIL_MAX_BATCH = 500  # 한 번의 update()에 담을 최대 측정값 수
+
 # 업로드 간격 (초) - 아두이노 업데이트 간격과 맞춤 (5분 = 300초)
 UPLOAD_INTERVAL = 300
 
+# 파일 감시 (--watch): inotify 사용, 지원되지 않으면 폴링
+WATCH_DEBOUNCE = 0.2  # 마지막 이벤트 후 이 시간(초) 동안 조용하면 한 번만 처리
+WATCH_POLL_INTERVAL = 1  # 폴링 대체 모드 간격 (초)
+
+# 중복 업로드 방지: 측정값(시간 필드 제외)이 마지막 업로드와 같으면 건너뜀
+DEDUP_STATE_PATH = "/home/pi/arduino_data/.upload_hashes.json"  # 재시작 후에도 유지
+DEDUP_VOLATILE_FIELDS = ('timestamp', 'lastUpdated')
+DEDUP_REFRESH = 3600  # 내용이 같아도 이 시간(초)이 지나면 다시 기록 (앱의 lastUpdated 갱신용)
+
 # Firebase 데이터 경로 (예: /sensors/device_0)
 # 앱에서 참조하는 경로와 일치해야 함
 FIREBASE_PATH_TEMPLATE = "sensors/device_{device_id}"
+# --tail 모드에서 모든 측정값이 쌓이는 경로
+HISTORY_PATH_TEMPLATE = "sensor_history/device_{device_id}"
+# RTDB 키에 쓸 수 없는 문자 (float timestamp의 '.' 등) → '_'로 치환
+RTDB_KEY_FORBIDDEN = str.maketrans({c: '_' for c in '.$#[]/'})
 
 # ===============================================
 
@@ -73,24 +107,29 @@ def init_firebase():
         print(f"❌ Firebase 초기화 실패: {e}")
         return False
 
-def read_arduino_json():
+def validate_reading(data):
+    """필수 필드 검증"""
+    if not isinstance(data, dict):
+        print("⚠️  측정값이 JSON 객체가 아닙니다")
+        return False
+    required_fields = ['temp', 'hum', 'lux']
+    for field in required_fields:
+        if field not in data:
+            print(f"⚠️  필수 필드 누락: {field}")
+            return False
+    return True
+
+def read_arduino_json(path=ARDUINO_JSON_PATH):
     """아두이노 JSON 파일 읽기"""
     try:
-        if not os.path.exists(ARDUINO_JSON_PATH):
-            print(f"⚠️  JSON 파일을 찾을 수 없습니다: {ARDUINO_JSON_PATH}")
+        if not os.path.exists(path):
+            print(f"⚠️  JSON 파일을 찾을 수 없습니다: {path}")
             return None
         
-        with open(ARDUINO_JSON_PATH, 'r', encoding='utf-8') as f:
+        with open(path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
-        # 데이터 검증
-        required_fields = ['temp', 'hum', 'lux']
-        for field in required_fields:
-            if field not in data:
-                print(f"⚠️  필수 필드 누락: {field}")
-                return None
-        
-        return data
+        return data if validate_reading(data) else None
     except json.JSONDecodeError as e:
         print(f"❌ JSON 파싱 오류: {e}")
         return None
@@ -98,19 +137,79 @@ def read_arduino_json():
         print(f"❌ 파일 읽기 오류: {e}")
         return None
 
+class UploadDeduper:
+    """경로별로 마지막 업로드 내용의 해시를 기억해 같은 측정값의 재업로드를 막습니다.
+
+    해시는 시간 필드를 뺀 데이터를 키 정렬한 JSON으로 만들어 계산하고,
+    상태 파일에 원자적으로 저장해 재시작 후에도 유지합니다.
+    """
+
+    def __init__(self, path=DEDUP_STATE_PATH, refresh=DEDUP_REFRESH):
+        self.path = path
+        self.refresh = refresh
+        self.skipped = 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)  # firebase 경로 -> [해시, 업로드 시각]
+        except FileNotFoundError:
+            self.entries = {}
+        except ValueError as e:
+            print(f"⚠️  중복 방지 상태 파일 손상, 새로 시작합니다: {e}")
+            self.entries = {}
+
+    @staticmethod
+    def digest(data):
+        payload = {k: v for k, v in data.items() if k not in DEDUP_VOLATILE_FIELDS}
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def is_duplicate(self, firebase_path, data):
+        entry = self.entries.get(firebase_path)
+        if entry is None or entry[0] != self.digest(data) or time.time() - entry[1] >= self.refresh:
+            return False
+        self.skipped += 1
+        return True
+
+    def record(self, uploaded):
+        """업로드에 성공한 {경로: 데이터}를 기록하고 저장"""
+        now = time.time()
+        for firebase_path, data in uploaded.items():
+            self.entries[firebase_path] = [self.digest(data), now]
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️  중복 방지 상태 저장 실패: {e}")
+
+
+deduper = UploadDeduper()
+
+def stamp(data):
+    """타임스탬프 추가"""
+    data['timestamp'] = int(time.time() * 1000)
+    data['lastUpdated'] = datetime.now().isoformat()
+    return data
+
 def upload_to_firebase(data):
     """Firebase에 데이터 업로드"""
     try:
         device_id = data.get('id', 0)
         firebase_path = FIREBASE_PATH_TEMPLATE.format(device_id=device_id)
         
-        # 타임스탬프 추가
-        data['timestamp'] = int(time.time() * 1000)
-        data['lastUpdated'] = datetime.now().isoformat()
+        if deduper.is_duplicate(firebase_path, data):
+            print(f"⏭️  변경 없음, 업로드 건너뜀: {firebase_path}")
+            return True
+        
+        stamp(data)
         
         # Firebase에 데이터 쓰기
         ref = db.reference(firebase_path)
         ref.set(data)
+        deduper.record({firebase_path: data})
         
         print(f"✅ Firebase 업로드 완료: {firebase_path}")
         print(f"   온도: {data.get('temp')}°C, 습도: {data.get('hum')}%, 조도: {data.get('lux')}lx")
@@ -119,25 +218,337 @@ def upload_to_firebase(data):
         print(f"❌ Firebase 업로드 실패: {e}")
         return False
 
-def watch_file_changes(file_path, callback, interval=1):
-    """파일 변경 감지 및 콜백 실행"""
-    last_modified = None
-    
-    while True:
+# ==================== 파일 감시 ====================
+
+IN_MODIFY = 0x00000002  # 파일 내용 변경 (append 로그용)
+IN_CLOSE_WRITE = 0x00000008  # 쓰기 모드로 열린 파일이 닫힘 (쓰기 완료)
+IN_MOVED_TO = 0x00000080  # 다른 이름에서 이동됨 (임시 파일 → rename 원자적 교체)
+IN_CREATE = 0x00000100  # 새 파일 생성 (로그 회전)
+IN_Q_OVERFLOW = 0x00004000  # 이벤트 큐 넘침 - 전체 재검사 필요
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """inotify로 디렉토리를 감시합니다 (Linux 전용, 외부 패키지 불필요).
+
+    파일 자체가 아닌 상위 디렉토리를 감시하므로 rename으로 교체된 파일도 놓치지 않습니다.
+    쓰기 도중(IN_MODIFY)에는 반응하지 않고 닫힘/이동 이벤트에만 반응합니다.
+    대기 중에는 select()에서 블록되므로 CPU를 사용하지 않습니다.
+    """
+
+    def __init__(self, directory, match, debounce=WATCH_DEBOUNCE, events=IN_CLOSE_WRITE | IN_MOVED_TO):
+        self.directory = directory
+        self.match = match
+        self.debounce = debounce
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 실패")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), events)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch 실패: {directory}")
+
+    def _read_events(self, changed):
         try:
-            if os.path.exists(file_path):
-                current_modified = os.path.getmtime(file_path)
-                
-                if last_modified is None or current_modified > last_modified:
-                    last_modified = current_modified
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(buf):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(buf, offset)
+            offset += INOTIFY_EVENT.size
+            name = buf[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                changed.update(n for n in os.listdir(self.directory) if self.match(n))
+            elif name and self.match(name):
+                changed.add(name)
+
+    def wait(self, timeout=None):
+        """변경된 파일 이름 집합을 반환합니다. 연속된 이벤트는 debounce 동안 모아서 한 번에."""
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            self._read_events(changed)
+            ready, _, _ = select.select([self.fd], [], [], self.debounce)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """inotify를 사용할 수 없을 때의 대체 감시자.
+
+    mtime만이 아니라 (mtime_ns, 크기, inode)를 비교해 같은 mtime 안의 변경과 rename 교체를
+    감지하고, 쓰기 중인 파일은 서명이 debounce 동안 변하지 않을 때까지 기다립니다.
+    """
+
+    def __init__(self, directory, match, interval=WATCH_POLL_INTERVAL, debounce=WATCH_DEBOUNCE):
+        self.directory = directory
+        self.match = match
+        self.interval = interval
+        self.debounce = debounce
+        self.signatures = self._scan()
+
+    def _scan(self):
+        signatures = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if self.match(entry.name):
+                        st = entry.stat()
+                        signatures[entry.name] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            pass
+        return signatures
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {n for n, sig in current.items() if self.signatures.get(n) != sig}
+            if changed:
+                # 쓰기가 끝날 때까지 서명이 안정되기를 기다림
+                time.sleep(self.debounce)
+                settled = self._scan()
+                if all(settled.get(n) == current[n] for n in changed):
+                    self.signatures = settled
+                    return changed
+                continue
+            self.signatures = current
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory, match, events=IN_CLOSE_WRITE | IN_MOVED_TO):
+    """inotify 감시자를 만들고, 실패하면 폴링 감시자로 대체합니다."""
+    try:
+        watcher = InotifyWatcher(directory, match, events=events)
+        print("👀 inotify로 파일을 감시합니다")
+        return watcher
+    except (OSError, AttributeError) as e:
+        print(f"⚠️  inotify 사용 불가 ({e}) - {WATCH_POLL_INTERVAL}초 폴링으로 대체합니다")
+        return PollingWatcher(directory, match)
+
+
+def watch_file_changes(file_path, callback):
+    """파일 변경 감지 및 콜백 실행 (쓰기 완료/rename 교체 시 한 번씩)"""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    watcher = make_watcher(directory, lambda n: n == name)
+    
+    try:
+        if os.path.exists(file_path):
+            callback()
+        else:
+            print(f"⚠️  파일이 존재하지 않습니다: {file_path}")
+        
+        while True:
+            try:
+                if watcher.wait():
                     print(f"📄 파일 변경 감지: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
                     callback()
-            else:
-                print(f"⚠️  파일이 존재하지 않습니다: {file_path}")
-        except Exception as e:
-            print(f"❌ 파일 감시 오류: {e}")
+            except Exception as e:
+                print(f"❌ 파일 감시 오류: {e}")
+                time.sleep(WATCH_POLL_INTERVAL)
+    finally:
+        watcher.close()
+
+# ==================== 여러 장치 폴더 ====================
+
+def is_device_file(name):
+    return name.endswith('.json') and not name.startswith('.')
+
+
+def flush_devices(directory, names, pool):
+    """변경된 장치 파일들을 병렬로 파싱해 하나의 다중 경로 update()로 기록
+
+    Returns:
+        다시 시도해야 할 파일 이름 집합 (업로드 실패 시 전체, 성공 시 빈 집합)
+    """
+    names = sorted(names)
+    readings = pool.map(read_arduino_json, [os.path.join(directory, n) for n in names])
+    updates = {}
+    for name, data in zip(names, readings):
+        if data is None:
+            continue  # 파싱 실패한 파일은 다음 변경 때 다시 읽음
+        firebase_path = FIREBASE_PATH_TEMPLATE.format(device_id=data.get('id', Path(name).stem))
+        if deduper.is_duplicate(firebase_path, data):
+            continue
+        updates[firebase_path] = stamp(data)
+    if not updates:
+        return set()
+    try:
+        db.reference('/').update(updates)
+        deduper.record(updates)
+        print(f"✅ {len(updates)}개 장치 업로드 완료 (update 1회): {', '.join(updates)}")
+        return set()
+    except Exception as e:
+        print(f"❌ Firebase 업로드 실패 ({len(updates)}개 장치): {e}")
+        return set(names)
+
+
+def watch_directory(directory):
+    """폴더 안의 장치 파일들을 감시하며 FLUSH_WINDOW마다 한 번에 업로드"""
+    if not os.path.isdir(directory):
+        # 아직 Arduino 쪽이 한 번도 쓰지 않았으면 폴더가 없을 수 있음 → 만들어 두고 감시
+        try:
+            os.makedirs(directory, exist_ok=True)
+            print(f"📁 감시 폴더를 생성했습니다: {directory}")
+        except OSError as e:
+            print(f"❌ 감시 폴더를 만들 수 없습니다: {directory} ({e})")
+            print("   ARDUINO_JSON_DIR 경로와 권한을 확인하세요")
+            sys.exit(1)
+    watcher = make_watcher(directory, is_device_file)
+    pending = {n for n in os.listdir(directory) if is_device_file(n)}
+    try:
+        with ThreadPoolExecutor(max_workers=PARSE_WORKERS) as pool:
+            while True:
+                if pending:
+                    pending = flush_devices(directory, pending, pool)
+                # 변경이 없으면 블록, 실패한 업로드가 남아 있으면 재시도 간격까지만 대기
+                changed = watcher.wait(FLUSH_RETRY_INTERVAL if pending else None)
+                if not changed:
+                    continue
+                pending |= changed
+                window_end = time.monotonic() + FLUSH_WINDOW
+                while (remaining := window_end - time.monotonic()) > 0:
+                    pending |= watcher.wait(remaining)
+    finally:
+        watcher.close()
+
+# ==================== NDJSON 이어 읽기 ====================
+
+class NdjsonTail:
+    """append 전용 NDJSON 파일에서 새로 추가된 줄만 읽습니다.
+
+    체크포인트에는 (inode, 오프셋, 파일 앞부분)을 저장해 재시작 시 이어서 읽고,
+    inode나 앞부분이 바뀌면 회전, 크기가 오프셋보다 작아지면 잘림으로 보고 처음부터 읽습니다.
+    줄바꿈으로 끝나지 않은 마지막 줄은 아직 쓰는 중으로 보고 다음 번에 읽습니다.
+    """
+
+    HEAD_BYTES = 64
+
+    def __init__(self, path, checkpoint_path):
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.inode = None
+        self.offset = 0
+        self.head = ""
+        try:
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self.inode, self.offset, self.head = saved['inode'], saved['offset'], saved['head']
+            print(f"📍 체크포인트에서 이어 읽기: {self.offset} 바이트")
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as e:
+            print(f"⚠️  체크포인트 손상, 처음부터 읽습니다: {e}")
+
+    def read_new(self):
+        """새 측정값 목록과 (inode, 다음 오프셋, 앞부분)을 반환합니다. 커밋은 업로드 후 commit()으로."""
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            head = f.read(self.HEAD_BYTES).hex()
+            offset = self.offset
+            if self.inode is not None and (st.st_ino != self.inode or not head.startswith(self.head)):
+                print("🔄 로그 회전 감지 - 새 파일을 처음부터 읽습니다")
+                offset = 0
+            elif st.st_size < offset:
+                print("✂️  로그 잘림 감지 - 처음부터 읽습니다")
+                offset = 0
+            f.seek(offset)
+            chunk = f.read()
         
-        time.sleep(interval)
+        end = chunk.rfind(b"\n") + 1  # 마지막 줄바꿈까지만 처리 (쓰는 중인 줄은 남겨둠)
+        readings = []
+        position = offset
+        for line in chunk[:end].splitlines(keepends=True):
+            line_offset = position
+            position += len(line)
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                print(f"⚠️  {line_offset} 바이트 위치의 줄 건너뜀: {e}")
+                continue
+            if validate_reading(data):
+                readings.append((line_offset, data))
+        return readings, (st.st_ino, offset + end, head[:self.HEAD_BYTES * 2])
+
+    def commit(self, position):
+        """업로드가 끝난 위치를 원자적으로 저장합니다."""
+        self.inode, self.offset, self.head = position
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'inode': self.inode, 'offset': self.offset, 'head': self.head}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+
+def upload_readings(readings, inode):
+    """측정값 전체를 하나의 다중 경로 update()로 기록 (히스토리 + 최신값)
+
+    히스토리 키는 측정값의 timestamp(없으면 파일 위치)라서, 체크포인트 저장 직전에 죽어
+    다시 올리더라도 같은 키에 덮어써 중복이 생기지 않습니다.
+    """
+    updates = {}
+    for line_offset, data in readings:
+        device_id = data.get('id', 0)
+        key = str(data['timestamp']) if 'timestamp' in data else f"{inode}-{line_offset}"
+        key = key.translate(RTDB_KEY_FORBIDDEN)
+        data.setdefault('timestamp', int(time.time() * 1000))
+        updates[f"{HISTORY_PATH_TEMPLATE.format(device_id=device_id)}/{key}"] = data
+        latest = dict(data, lastUpdated=datetime.now().isoformat())
+        updates[FIREBASE_PATH_TEMPLATE.format(device_id=device_id)] = latest
+    try:
+        db.reference('/').update(updates)
+        last = readings[-1][1]
+        print(f"✅ {len(readings)}개 측정값 업로드 완료")
+        print(f"   온도: {last.get('temp')}°C, 습도: {last.get('hum')}%, 조도: {last.get('lux')}lx")
+        return True
+    except Exception as e:
+        print(f"❌ Firebase 업로드 실패: {e}")
+        return False
+
+
+def ingest_new_lines(tail):
+    """새 줄을 읽어 업로드하고, 성공하면 체크포인트를 저장합니다."""
+    try:
+        readings, position = tail.read_new()
+    except FileNotFoundError:
+        print(f"⚠️  파일이 존재하지 않습니다: {tail.path}")
+        return
+    for start in range(0, len(readings), TAIL_MAX_BATCH):
+        batch = readings[start:start + TAIL_MAX_BATCH]
+        if not upload_readings(batch, position[0]):
+            return  # 체크포인트를 옮기지 않음 - 다음 이벤트 때 다시 시도
+        if start + TAIL_MAX_BATCH < len(readings):
+            # 부분 진행 저장: 다음 배치의 첫 줄 위치까지
+            tail.commit((position[0], readings[start + TAIL_MAX_BATCH][0], position[2]))
+    tail.commit(position)
+
+
+def tail_ndjson(path, checkpoint_path):
+    """NDJSON 로그를 감시하며 추가된 측정값을 모두 업로드"""
+    tail = NdjsonTail(path, checkpoint_path)
+    directory, name = os.path.split(os.path.abspath(path))
+    watcher = make_watcher(directory, lambda n: n == name,
+                           events=IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+    try:
+        ingest_new_lines(tail)
+        while True:
+            if watcher.wait():
+                ingest_new_lines(tail)
+    finally:
+        watcher.close()
 
 def main():
     """메인 실행 함수"""
@@ -156,8 +567,33 @@ def main():
     # 실행 모드 확인
     continuous = '--continuous' in sys.argv or '-c' in sys.argv
     watch_mode = '--watch' in sys.argv or '-w' in sys.argv
+    tail_mode = '--tail' in sys.argv
+    dir_mode = '--dir' in sys.argv
+    
+    if dir_mode:
+        # 여러 장치 폴더 모드
+        print(f"\n🗂️  장치 폴더 모드 (Ctrl+C로 중지)")
+        print(f"   {ARDUINO_JSON_DIR} 안의 *.json 파일을 감시해 {FLUSH_WINDOW}초마다 한 번에 업로드합니다\n")
+        
+        try:
+            watch_directory(ARDUINO_JSON_DIR)
+        except KeyboardInterrupt:
+            print("\n\n✋ 사용자에 의해 중지되었습니다")
+            sys.exit(0)
+    
+    elif tail_mode:
+        # NDJSON 이어 읽기 모드
+        print("\n📜 NDJSON 이어 읽기 모드 (Ctrl+C로 중지)")
+        print(f"   {ARDUINO_NDJSON_PATH} 에 추가되는 모든 측정값을 업로드합니다")
+        print(f"   체크포인트: {NDJSON_CHECKPOINT_PATH}\n")
+        
+        try:
+            tail_ndjson(ARDUINO_NDJSON_PATH, NDJSON_CHECKPOINT_PATH)
+        except KeyboardInterrupt:
+            print("\n\n✋ 사용자에 의해 중지되었습니다")
+            sys.exit(0)
     
-    if watch_mode:
+    elif watch_mode:
         # 파일 변경 감지 모드
         print("\n📡 파일 변경 감지 모드 (Ctrl+C로 중지)")
         print(f"   {ARDUINO_JSON_PATH} 파일을 감시합니다...\n")
@@ -209,6 +645,8 @@ def main():
         
         print("\n💡 Tip: 연속 모드로 실행하려면 --continuous 플래그를 사용하세요")
         print("        파일 변경 감지 모드: --watch")
+        print("        NDJSON 이어 읽기 모드: --tail")
+        print("        여러 장치 폴더 모드: --dir")
 
 if __name__ == '__main__':
     main()
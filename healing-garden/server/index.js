@@ -135,23 +135,123 @@ const sensors = {};
 // In-memory store for LCD commands per terrarium (for Raspberry Pi clients to poll)
 const lcdCommands = {};
 
+// Clients waiting for the next LCD command per terrarium (SSE streams and long-poll requests)
+const lcdWaiters = {};
+const LCD_MAX_WAIT_MS = 60000;
+const LCD_HEARTBEAT_MS = 30000;
+
+const addLcdWaiter = (id, fn) => {
+  if (!lcdWaiters[id]) lcdWaiters[id] = new Set();
+  lcdWaiters[id].add(fn);
+  return () => {
+    lcdWaiters[id].delete(fn);
+    if (lcdWaiters[id].size === 0) delete lcdWaiters[id];
+  };
+};
+
+const notifyLcdWaiters = (id, command) => {
+  if (!lcdWaiters[id]) return;
+  for (const fn of Array.from(lcdWaiters[id])) fn(command);
+};
+
+// Server clock for LCD clients estimating their clock offset (NTP-style exchanges)
+app.get('/time', (req, res) => res.json({ now: Date.now() }));
+
+// Build an LCD command from a request body. For synchronized playback pass startAt (server
+// time in ms) or delay (ms from now), plus offset (clip position in seconds) and loop.
+const buildLcdCommand = (body, now) => {
+  const { action, url, volume, position, offset, loop, delay } = body;
+  let { startAt } = body;
+  if (typeof startAt === 'undefined' && typeof delay !== 'undefined') startAt = now + Number(delay);
+  return { action, url, volume, position, startAt, offset, loop, timestamp: now };
+};
+
+const saveLcdCommand = (id, command) => {
+  lcdCommands[id] = command;
+  console.log(`LCD command saved for id=${id}:`, lcdCommands[id]);
+  notifyLcdWaiters(id, lcdCommands[id]);
+};
+
+// POST one command to several displays with a shared start time
+// body: { ids: [...], action, url?, volume?, delay? (default 3000 ms), startAt?, offset?, loop? }
+app.post('/lcd/sync/command', (req, res) => {
+  const body = req.body || {};
+  if (!body.action) return res.status(400).json({ error: 'missing action' });
+  if (!Array.isArray(body.ids) || body.ids.length === 0) return res.status(400).json({ error: 'missing ids' });
+
+  const command = buildLcdCommand({ delay: 3000, ...body }, Date.now());
+  body.ids.forEach((id) => saveLcdCommand(String(id), { ...command }));
+  return res.json({ ok: true, startAt: command.startAt });
+});
+
 // POST a command for the LCD player attached to a terrarium Pi
-// body: { action: 'play'|'pause'|'stop'|'set_url'|'set_volume', url?, volume? }
+// body: { action: 'play'|'pause'|'resume'|'stop'|'set_url'|'set_volume'|'seek', url?, volume?, position?,
+//         startAt?, delay?, offset?, loop? }
 app.post('/lcd/:id/command', (req, res) => {
   const id = req.params.id;
-  const { action, url, volume } = req.body || {};
-  if (!action) return res.status(400).json({ error: 'missing action' });
+  const body = req.body || {};
+  if (!body.action) return res.status(400).json({ error: 'missing action' });
 
-  lcdCommands[id] = { action, url, volume, timestamp: Date.now() };
-  console.log(`LCD command saved for id=${id}:`, lcdCommands[id]);
+  saveLcdCommand(id, buildLcdCommand(body, Date.now()));
   return res.json({ ok: true });
 });
 
 // GET the last command for a Pi to consume. Returns the latest command (does NOT auto-clear)
+// Long-poll: ?since=<timestamp>&wait=<seconds> holds the request until a command newer than
+// `since` arrives or `wait` expires. The X-Long-Poll header tells clients the server supports it.
 app.get('/lcd/:id/last', (req, res) => {
   const id = req.params.id;
-  if (!lcdCommands[id]) return res.status(404).json({ ok: false, error: 'no_command' });
-  return res.json({ ok: true, command: lcdCommands[id] });
+  const since = req.query.since;
+  const waitMs = Math.min(LCD_MAX_WAIT_MS, Math.max(0, Number(req.query.wait) * 1000 || 0));
+  res.set('X-Long-Poll', '1');
+
+  const reply = () => {
+    if (!lcdCommands[id]) return res.status(404).json({ ok: false, error: 'no_command' });
+    return res.json({ ok: true, command: lcdCommands[id] });
+  };
+
+  const current = lcdCommands[id];
+  if (!waitMs || (current && String(current.timestamp) !== String(since))) return reply();
+
+  let done = false;
+  const finish = () => {
+    if (done) return;
+    done = true;
+    clearTimeout(timer);
+    remove();
+    reply();
+  };
+  const remove = addLcdWaiter(id, finish);
+  const timer = setTimeout(finish, waitMs);
+  req.on('close', () => {
+    done = true;
+    clearTimeout(timer);
+    remove();
+  });
+});
+
+// Server-Sent Events stream of LCD commands. Sends the current command on connect, then every
+// new command as it is posted. Only a comment heartbeat is sent while idle.
+app.get('/lcd/:id/events', (req, res) => {
+  const id = req.params.id;
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    Connection: 'keep-alive',
+  });
+  res.flushHeaders();
+
+  const send = (command) => {
+    res.write(`id: ${command.timestamp}\nevent: command\ndata: ${JSON.stringify(command)}\n\n`);
+  };
+  if (lcdCommands[id]) send(lcdCommands[id]);
+
+  const remove = addLcdWaiter(id, send);
+  const heartbeat = setInterval(() => res.write(': ping\n\n'), LCD_HEARTBEAT_MS);
+  req.on('close', () => {
+    clearInterval(heartbeat);
+    remove();
+  });
 });
 
 // Optionally allow a Pi to acknowledge/clear the last command
@@ -201,11 +301,28 @@ app.post('/upload/video', upload.single('video'), (req, res) => {
 });
 
 // Sensor update endpoint (IoT devices post here)
+function applySensorUpdate(body) {
+  const { id, name, plantType, temp, hum, lux, timestamp } = body || {};
+  if (typeof id === 'undefined') return false;
+  const ts = timestamp || Date.now();
+  // Batches may carry older readings; never replace a newer one
+  if (sensors[id] && sensors[id].timestamp > ts) return true;
+  sensors[id] = { id, name, plantType, temp, hum, lux, timestamp: ts };
+  return true;
+}
+
+// Accepts a single snapshot object or an array of snapshots. Batches from
+// pi_post_sensor.py are sent with Content-Encoding: gzip, which express.json()
+// inflates before parsing.
 app.post('/sensors/update', (req, res) => {
-  const { id, name, plantType, temp, hum, lux, timestamp } = req.body || {};
-  if (typeof id === 'undefined') return res.status(400).json({ error: 'missing id' });
-  sensors[id] = { id, name, plantType, temp, hum, lux, timestamp: timestamp || Date.now() };
-  console.log('sensor update', id, sensors[id]);
+  if (Array.isArray(req.body)) {
+    const accepted = req.body.filter(applySensorUpdate).length;
+    if (!accepted) return res.status(400).json({ error: 'missing id' });
+    console.log('sensor batch', accepted, 'of', req.body.length);
+    return res.json({ ok: true, accepted });
+  }
+  if (!applySensorUpdate(req.body)) return res.status(400).json({ error: 'missing id' });
+  console.log('sensor update', req.body.id, sensors[req.body.id]);
   return res.json({ ok: true });
 });
 